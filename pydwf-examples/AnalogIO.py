@@ -2,12 +2,49 @@
 
 """Demonstrate the use of the AnalogIO functionality."""
 
+from typing import Dict, NamedTuple, Optional, Tuple
+import sys
 import time
 import argparse
 
-from pydwf import DwfLibrary, PyDwfError
+from pydwf import DwfLibrary, DwfAnalogIO, PyDwfError
 from pydwf.utilities import openDwfDevice
 
+from dwf_daemon import run_on_daemon
+
+
+class AnalogIONodeSnapshot(NamedTuple):
+    """Metadata and status of a single AnalogIO channel node."""
+    node_name: Tuple[str, str]
+    node_info: DwfAnalogIO
+    node_set_info: Tuple[float, float, int]
+    node_get: float
+    node_status_info: Tuple[float, float, int]
+    node_status: float
+
+
+def snapshot_channel_nodes(analogIO) -> Dict[Tuple[int, int], AnalogIONodeSnapshot]:
+    """Read the metadata and status of all AnalogIO channel nodes in a single pass.
+
+    The status of all channels is requested once; the node values are then read from that status.
+    The result is a dictionary keyed by (channel_index, node_index).
+    """
+
+    analogIO.status()  # Request status update of all channels.
+
+    return {
+        (channel_index, node_index): AnalogIONodeSnapshot(
+            analogIO.channelNodeName(channel_index, node_index),
+            analogIO.channelNodeInfo(channel_index, node_index),
+            analogIO.channelNodeSetInfo(channel_index, node_index),
+            analogIO.channelNodeGet(channel_index, node_index),
+            analogIO.channelNodeStatusInfo(channel_index, node_index),
+            analogIO.channelNodeStatus(channel_index, node_index)
+        )
+        for channel_index in range(analogIO.channelCount())
+        for node_index in range(analogIO.channelInfo(channel_index))
+    }
+
 
 def demo_analog_io_api(analogIO) -> None:
     """Demonstrates the Analog I/O functionality."""
@@ -20,73 +57,110 @@ def demo_analog_io_api(analogIO) -> None:
     enableGet = analogIO.enableGet()
     enableStatus = analogIO.enableStatus()
 
-    print("analogIO.enableSet() supported ......... : {}".format(enableSetSupported))
-    print("analogIO.enableStatus() supported ...... : {}".format(enableStatusSupported))
-    print("analogIO.enableGet() ................... : {}".format(enableGet))
-    print("analogIO.enableStatus() ................ : {}".format(enableStatus))
+    print(f"analogIO.enableSet() supported ......... : {enableSetSupported}")
+    print(f"analogIO.enableStatus() supported ...... : {enableStatusSupported}")
+    print(f"analogIO.enableGet() ................... : {enableGet}")
+    print(f"analogIO.enableStatus() ................ : {enableStatus}")
     print()
 
-    analogIO.status()  # Request status update of all channels.
+    snapshot = snapshot_channel_nodes(analogIO)
 
     channel_count = analogIO.channelCount()
-    print("The Analog I/O device has {} channels:".format(channel_count))
+    print(f"The Analog I/O device has {channel_count} channels:")
     print()
 
     for channel_index in range(channel_count):
         channel_name = analogIO.channelName(channel_index)
         node_count = analogIO.channelInfo(channel_index)  # Count number of nodes.
-        print("Channel #{} ({} of {} channels) named {} has {} nodes:".format(
-            channel_index, channel_index + 1, channel_count, channel_name, node_count))
-        print()
+
+        # Assemble the description of the channel and its nodes, and write it in one go.
+        lines = [
+            f"Channel #{channel_index} ({channel_index + 1} of {channel_count} channels) named {channel_name} "
+            f"has {node_count} nodes:",
+            ""
+        ]
 
         for node_index in range(node_count):
-            node_name = analogIO.channelNodeName(channel_index, node_index)
-            node_info = analogIO.channelNodeInfo(channel_index, node_index)
-            node_set_info = analogIO.channelNodeSetInfo(channel_index, node_index)
-            node_get = analogIO.channelNodeGet(channel_index, node_index)
-            node_status_info = analogIO.channelNodeStatusInfo(channel_index, node_index)
-            node_status = analogIO.channelNodeStatus(channel_index, node_index)
-            print("    node #{} ({} of {}):".format(node_index, node_index + 1, node_count))
-            print("        node_name ............. {}".format(node_name))
-            print("        node_info ............. {}".format(node_info))
-            print("        node_set_info ......... {}".format(node_set_info))
-            print("        node_get .............. {}".format(node_get))
-            print("        node_status_info ...... {}".format(node_status_info))
-            print("        node_status ........... {}".format(node_status))
-            print()
-
-
-def demo_analog_io_continuous_readout(analogIO, channel_name) -> None:
-    """Demonstrate continuous readout of USB monitor using AnalogIO functionality."""
+            node = snapshot[(channel_index, node_index)]
+            lines += [
+                f"    node #{node_index} ({node_index + 1} of {node_count}):",
+                f"        node_name ............. {node.node_name}",
+                f"        node_info ............. {node.node_info}",
+                f"        node_set_info ......... {node.node_set_info}",
+                f"        node_get .............. {node.node_get}",
+                f"        node_status_info ...... {node.node_status_info}",
+                f"        node_status ........... {node.node_status}",
+                ""
+            ]
 
-    channel_count = analogIO.channelCount()
+        sys.stdout.write("\n".join(lines) + "\n")
 
-    channel_matches = [channel_index for channel_index in range(channel_count)
-                       if analogIO.channelName(channel_index)[0] == channel_name]
 
-    if len(channel_matches) != 1:
-        raise RuntimeError("Unable to find unique channel {!r}.".format(channel_name))
+def channel_indices_by_name(analogIO) -> Dict[str, Optional[int]]:
+    """Map the names of the AnalogIO channels to their channel indices.
+
+    A name that is shared by several channels maps to None.
+    """
+
+    channel_indices: Dict[str, Optional[int]] = {}
 
-    channel_index = channel_matches[0]
+    for channel_index in range(analogIO.channelCount()):
+        channel_name = analogIO.channelName(channel_index)[0]
+        channel_indices[channel_name] = None if channel_name in channel_indices else channel_index
+
+    return channel_indices
+
+
+def demo_analog_io_continuous_readout(analogIO, channel_indices: Dict[str, Optional[int]], channel_name) -> None:
+    """Demonstrate continuous readout of USB monitor using AnalogIO functionality.
+
+    The 'channel_indices' argument maps channel names to channel indices, as returned by channel_indices_by_name().
+    """
+
+    channel_index = channel_indices.get(channel_name)
+    if channel_index is None:
+        raise RuntimeError("Unable to find unique channel {!r}.".format(channel_name))
 
     node_count = analogIO.channelInfo(channel_index)  # Count number of nodes.
 
     # Get info on all existing nodes.
 
-    node_info = [analogIO.channelNodeName(channel_index, node_index) for node_index in range(node_count)]
+    node_indices = range(node_count)
+
+    node_info = [analogIO.channelNodeName(channel_index, node_index) for node_index in node_indices]
+
+    # The node descriptions and units do not change; build a line template that only has placeholders for the values.
+    line_template = f"{channel_name}: " + " ; ".join(
+        f"{description.lower()} = {{:.9f}} [{unit}]" for (description, unit) in node_info)
 
-    print("*** Reading {!r} channel nodes, press CTRL-C to stop. ***".format(channel_name))
+    print(f"*** Reading {channel_name!r} channel nodes, press CTRL-C to stop. ***")
     print()
 
+    readout_period = 0.500
+    next_deadline = time.monotonic()
+
     while True:
         analogIO.status()  # Request status update
-        node_values = [analogIO.channelNodeStatus(channel_index, node_index) for node_index in range(node_count)]
-        print("{}: {}".format(channel_name,
-                              " ; ".join("{} = {:.9f} [{}]".format(description.lower(), value, unit)
-                                         for ((description, unit), value) in zip(node_info, node_values))))
+        node_values = [analogIO.channelNodeStatus(channel_index, node_index) for node_index in node_indices]
+        print(line_template.format(*node_values))
+
+        # Wait until start of next period. If we missed the deadline, restart the schedule rather than
+        # trying to catch up with a burst of readouts.
+        next_deadline += readout_period
+        now = time.monotonic()
+        if next_deadline < now:
+            next_deadline = now + readout_period
+        time.sleep(next_deadline - now)
 
-        # Wait until start of next period.
-        time.sleep(-time.time() % 0.500)
+
+def run_demos(device, args) -> None:
+    """Run the AnalogIO demos on an open device."""
+    # pylint: disable=unused-argument
+    analogIO = device.analogIO
+    # Look up the channel indices once per run; they are not cached across runs, or devices.
+    channel_indices = channel_indices_by_name(analogIO)
+    demo_analog_io_api(analogIO)
+    demo_analog_io_continuous_readout(analogIO, channel_indices, "USB Monitor")
 
 
 def main():
@@ -102,13 +176,22 @@ def main():
             help="serial number filter to select a specific Digilent Waveforms device"
         )
 
+    parser.add_argument(
+            "--connect",
+            action="store_true",
+            help="run the demo on the device kept open by a running dwf_daemon.py, rather than opening a device"
+        )
+
     args = parser.parse_args()
 
+    if args.connect:
+        run_on_daemon("AnalogIO", "run_demos", args)
+        return
+
     try:
         dwf = DwfLibrary()
         with openDwfDevice(dwf, serial_number_filter=args.serial_number_filter) as device:
-            demo_analog_io_api(device.analogIO)
-            demo_analog_io_continuous_readout(device.analogIO, "USB Monitor")
+            run_demos(device, args)
     except PyDwfError as exception:
         print("PyDwfError:", exception)
     except KeyboardInterrupt:
@@ -21,6 +21,10 @@ Next, we enter a loop where we continuously fetch data from the instrument by ca
 This is repeated until analogIn.status() returns DwfState.Done. Note that this last status() call also transfers
 acquisition data that needs to be processed.
 
+This polling loop runs in a background thread (AcquisitionWorker) that hands the fetched samples to the main thread
+through a queue. That way, the USB transfer of the next batch of samples overlaps with the processing of the
+previous batch in the main thread.
+
 After each status() call, we get information on the acquisition status by calling statusRecord(). This call
 returns three numbers: counts of available, lost, and corrupted samples.
 
@@ -36,10 +40,15 @@ suggest that the way to handle nonzero "lost" samples is to skip over them; this
 Assuming the lost and corrupt counts are zero, the 'available' count gives the number of valid samples available in
 the local (PC-side) buffer. These samples can be obtained using calls to statusData(), statusData2(), or
 statusData16(). The pydwf library implements these functions by having them allocate a sufficiently-sized local
-numpy array, reading the sample data into it, and returning that array.
+numpy array, reading the sample data into it, and returning that array. We copy these arrays into a single
+preallocated sample buffer as they arrive, so no per-chunk lists or final concatenation are needed.
+
+We use statusData16(), which returns the raw 16-bit sample values rather than 64-bit floating point voltages.
+This reduces the amount of data that is moved around during the acquisition by a factor of four. Only the samples
+that are kept at the end of the acquisition are converted to (32-bit floating point) voltages.
 
-At the end of the acquisition, i.e., after the status() function returns DwfState.Done, these sub-arrays are
-concatenated to deliver the full sample record of the acquisition.
+At the end of the acquisition, i.e., after the status() function returns DwfState.Done, the filled part of the
+sample buffer holds the full sample record of the acquisition.
 
 At that point, we discard all but the last (record_length * sample_frequency) samples that constitute the requested
 recording length. The preceding samples were received from the device, but the first few samples may be garbled,
@@ -52,46 +61,117 @@ sample is at the time, measured in seconds, returned by the analogIn.triggerPosi
 the trigger moment.
 """
 
+from typing import List, NamedTuple, Optional, Tuple
 import argparse
 import time
+import math
+import threading
+import queue
 import numpy as np
 import matplotlib.pyplot as plt
 
-from pydwf import (DwfLibrary, DwfEnumConfigInfo, DwfAnalogOutNode, DwfAnalogOutFunction, DwfAcquisitionMode,
-                   DwfTriggerSource, DwfAnalogInTriggerType, DwfTriggerSlope, DwfState, DwfAnalogInFilter,
-                   PyDwfError)
+from pydwf import (DwfLibrary, DwfEnumConfigInfo, DwfAcquisitionMode, DwfTriggerSource, DwfAnalogInTriggerType,
+                   DwfTriggerSlope, DwfState, DwfAnalogInFilter, PyDwfError)
 from pydwf.utilities import openDwfDevice
 
+from analog_in_demo_utilities import configure_analog_output, decimate_minmax
+from plot_utilities import BlittedPlot
+from dwf_daemon import run_on_daemon
+
+
+class AcquisitionChunk(NamedTuple):
+    """Samples and record status obtained from a single AnalogIn status() poll."""
+    samples: Optional[np.ndarray]  # (available, 2) array of raw int16 samples, or None if no samples are available.
+    lost: int
+    corrupted: int
+    done: bool
+    time_of_first_sample: Optional[float]  # Only known when 'done' is True.
+
+
+class AcquisitionWorker(threading.Thread):
+    """Background thread that polls the AnalogIn instrument during a single Record-mode acquisition.
+
+    The worker keeps the USB link busy by calling status(True) and fetching the available samples of all channels,
+    while the main thread processes the previously fetched samples. Each poll that yields anything of interest is
+    posted to the queue as an AcquisitionChunk. Any exception raised in the worker is posted as-is, so the main
+    thread can re-raise it, rather than waiting forever for a chunk that never comes.
+    """
+
+    def __init__(self, analogIn, channels: Tuple[int, ...], trigger_flag: bool):
+        super().__init__(daemon=True)
+        self.analogIn = analogIn
+        self.channels = channels
+        self.trigger_flag = trigger_flag
+        self.queue = queue.SimpleQueue()
+        self.stop_event = threading.Event()
+
+    def run(self):
+        analogIn = self.analogIn
+        try:
+            while not self.stop_event.is_set():
+
+                status = analogIn.status(True)
+                (samples_available, samples_lost, samples_corrupted) = analogIn.statusRecord()
+
+                done = (status == DwfState.Done)
+
+                if samples_available != 0:
+                    samples = np.empty((samples_available, len(self.channels)), dtype=np.int16)
+                    for (column, channel_index) in enumerate(self.channels):
+                        samples[:, column] = analogIn.statusData16(channel_index, 0, samples_available)
+                else:
+                    samples = None
+
+                if done:
+                    # Note the time, in seconds, of the first valid sample.
+                    time_of_first_sample = analogIn.triggerPositionStatus() if self.trigger_flag else 0.0
+                else:
+                    time_of_first_sample = None
 
-def configure_analog_output(analogOut, analog_out_frequency, analog_out_amplitude, analog_out_offset):
-    """Configure a cosine signal on channel 1, and a sine signal on channel 2."""
+                if samples is not None or samples_lost != 0 or samples_corrupted != 0 or done:
+                    self.queue.put(AcquisitionChunk(samples, samples_lost, samples_corrupted, done,
+                                                    time_of_first_sample))
 
-    CH1 = 0  # This channel will carry a 'cosine' (i.e., precede channel 2 by 90 degrees).
-    CH2 = 1  # This channel will carry a 'sine'.
+                if done:
+                    break
 
-    node = DwfAnalogOutNode.Carrier
+                if samples_available == 0:
+                    # Nothing to fetch yet; back off briefly rather than spinning on the USB link.
+                    self.stop_event.wait(0.001)
 
-    analogOut.reset(-1)  # Reset both channels.
+        except BaseException as exception:  # pylint: disable=broad-except
+            self.queue.put(exception)
 
-    analogOut.nodeEnableSet   (CH1, node, True)
-    analogOut.nodeFunctionSet (CH1, node, DwfAnalogOutFunction.Sine)
-    analogOut.nodeFrequencySet(CH1, node, analog_out_frequency)
-    analogOut.nodeAmplitudeSet(CH1, node, analog_out_amplitude)
-    analogOut.nodeOffsetSet   (CH1, node, analog_out_offset)
-    analogOut.nodePhaseSet    (CH1, node, 90.0)
 
-    analogOut.nodeEnableSet   (CH2, node, True)
-    analogOut.nodeFunctionSet (CH2, node, DwfAnalogOutFunction.Sine)
-    analogOut.nodeFrequencySet(CH2, node, analog_out_frequency)
-    analogOut.nodeAmplitudeSet(CH2, node, analog_out_amplitude)
-    analogOut.nodeOffsetSet   (CH2, node, analog_out_offset)
-    analogOut.nodePhaseSet    (CH2, node, 0.0)
+def _ingest(samples, write_index: int, chunk: AcquisitionChunk, lost_ranges: List[Tuple[int, int]]):
+    """Append the lost-sample placeholders and the samples of an acquisition chunk to the sample buffer.
 
-    # Synchronize second channel to first channel. This ensures that they will start simultaneously.
-    analogOut.masterSet(CH2, CH1)
+    The buffer is grown if needed. The (start, count) range of any lost samples is appended to 'lost_ranges'.
+    Returns the (possibly reallocated) sample buffer and the new write index.
+    """
 
-    # Start output on both channels.
-    analogOut.configure(CH1, True)
+    chunk_size = 0 if chunk.samples is None else len(chunk.samples)
+
+    required_size = write_index + chunk.lost + chunk_size
+    if required_size > len(samples):
+        # The device delivered more samples than we anticipated; grow the buffer.
+        samples = np.resize(samples, (max(required_size, 2 * len(samples)), samples.shape[1]))
+
+    if chunk.lost != 0:
+        # Reserve room for the lost samples, that will end up as NaN values. This follows the Digilent example.
+        # We haven't verified yet that this is the proper way to handle lost samples.
+        # The lost samples are tracked by their range rather than by a placeholder value, since every raw sample
+        # value can also be a valid sample.
+        samples[write_index:write_index + chunk.lost] = 0
+        lost_ranges.append((write_index, chunk.lost))
+        write_index += chunk.lost
+
+    if chunk_size != 0:
+        # Copy the samples of all channels into the sample buffer.
+        samples[write_index:write_index + chunk_size] = chunk.samples
+        write_index += chunk_size
+
+    return (samples, write_index)
 
 
 def run_demo(analogIn, sample_frequency, record_length, trigger_flag, signal_frequency, signal_amplitude):
@@ -137,87 +217,114 @@ def run_demo(analogIn, sample_frequency, record_length, trigger_flag, signal_fre
     # Calculate number of samples for each acquisition.
     num_samples = round(sample_frequency * record_length)
 
+    # Raw 16-bit samples span the channel range; determine the scale and offset to convert them to Volts.
+    sample_scale = np.array([analogIn.channelRangeGet(channel_index) / 65536.0 for channel_index in channels],
+                            dtype=np.float32)
+    sample_offset = np.array([analogIn.channelOffsetGet(channel_index) for channel_index in channels],
+                             dtype=np.float32)
+
+    # Preallocate the sample buffer that receives the data of both channels. The device generally delivers
+    # somewhat more samples than requested, so we leave some headroom; the buffer is grown if needed.
+    samples = np.empty((math.ceil(1.5 * num_samples), 2), dtype=np.int16)
+
+    # Sample times relative to the first sample. These only depend on the sample frequency, so we calculate them once.
+    sample_time_offsets = np.arange(num_samples, dtype=np.float64)
+    np.multiply(sample_time_offsets, 1.0 / sample_frequency, out=sample_time_offsets)
+
     # Outer loop: perform repeated acquisitions.
     acquisition_nr = 0
 
     ch1_line = None
     ch2_line = None
+    title = None
+    blitted_plot = None
 
     while True:
 
         acquisition_nr += 1  # Increment acquisition number.
 
-        print("[{}] Recording {} samples ...".format(acquisition_nr, num_samples))
+        print(f"[{acquisition_nr}] Recording {num_samples} samples ...")
 
         # Inner loop: single acquisition, receive data from AnalogIn instrument and display it.
 
-        samples = []
+        write_index = 0
+        lost_ranges = []
 
         total_samples_lost = total_samples_corrupted = 0
 
+        worker = AcquisitionWorker(analogIn, channels, trigger_flag)
+
         analogIn.configure(False, True)  # Start acquisition sequence.
 
-        while True:
-
-            status = analogIn.status(True)
-            (current_samples_available, current_samples_lost, current_samples_corrupted) = analogIn.statusRecord()
-
-            total_samples_lost += current_samples_lost
-            total_samples_corrupted += current_samples_corrupted
-
-            if current_samples_lost != 0:
-                # Append NaN samples as placeholders for lost samples.
-                # This follows the Digilent example.
-                # We haven't verified yet that this is the proper way to handle lost samples.
-                lost_samples = np.full((current_samples_lost, 2), np.nan)
-                samples.append(lost_samples)
-
-            if current_samples_available != 0:
-                # Append samples read from both channels.
-                # Note that we read the samples separately for each channel;
-                # We then put them into the same 2D array with shape (current_samples_available, 2).
-                current_samples = np.vstack([analogIn.statusData(channel_index, current_samples_available)
-                                             for channel_index in channels]).transpose()
-                samples.append(current_samples)
-
-            if status == DwfState.Done:
-                # We received the last of the record samples.
-                # Note the time, in seconds, of the first valid sample, and break from the acquisition loop.
-                if trigger_flag:
-                    time_of_first_sample = analogIn.triggerPositionStatus()
-                else:
-                    time_of_first_sample = 0.0
-                break
+        worker.start()
+
+        try:
+            while True:
+
+                chunk = worker.queue.get()
+
+                if isinstance(chunk, BaseException):
+                    raise chunk
+
+                total_samples_lost += chunk.lost
+                total_samples_corrupted += chunk.corrupted
+
+                (samples, write_index) = _ingest(samples, write_index, chunk, lost_ranges)
+
+                if chunk.done:
+                    # We received the last of the record samples.
+                    time_of_first_sample = chunk.time_of_first_sample
+                    break
+        finally:
+            worker.stop_event.set()
+            worker.join()
 
         if total_samples_lost != 0:
-            print("[{}] - WARNING - {} samples were lost! Reduce sample frequency.".format(
-                acquisition_nr, total_samples_lost))
+            print(f"[{acquisition_nr}] - WARNING - {total_samples_lost} samples were lost! Reduce sample frequency.")
 
         if total_samples_corrupted != 0:
-            print("[{}] - WARNING - {} samples could be corrupted! Reduce sample frequency.".format(
-                acquisition_nr, total_samples_corrupted))
+            print(f"[{acquisition_nr}] - WARNING - {total_samples_corrupted} samples could be corrupted! "
+                  "Reduce sample frequency.")
+
+        # The valid part of the sample buffer is an (n, 2) array of raw sample values.
+        discard_count = max(write_index - num_samples, 0)
 
-        # Concatenate all acquired samples. The result is an (n, 2) array of sample values.
-        samples = np.concatenate(samples)
+        if discard_count != 0:
+            print(f"[{acquisition_nr}] - NOTE - discarding oldest {discard_count} of {write_index} samples "
+                  f"({100.0 * discard_count / write_index:.1f}%); keeping {num_samples} samples.")
 
-        if len(samples) > num_samples:
-            discard_count = len(samples) - num_samples
-            print("[{}] - NOTE - discarding oldest {} of {} samples ({:.1f}%); keeping {} samples.".format(
-                acquisition_nr,
-                discard_count, len(samples), 100.0 * discard_count / len(samples), num_samples))
+        recorded_raw_samples = samples[discard_count:write_index]
 
-            samples = samples[discard_count:]
+        # Convert the raw samples that we keep to Volts.
+        recorded_samples = recorded_raw_samples.astype(np.float32)
+        recorded_samples *= sample_scale
+        recorded_samples += sample_offset
+
+        # Lost samples become NaN values.
+        for (lost_start, lost_count) in lost_ranges:
+            lost_end = lost_start + lost_count
+            if lost_end > discard_count:
+                recorded_samples[max(lost_start - discard_count, 0):lost_end - discard_count] = np.nan
 
         # Calculate sample time of each of the samples.
-        t = time_of_first_sample + np.arange(len(samples)) / sample_frequency
+        t = sample_time_offsets[:len(recorded_samples)] + time_of_first_sample
+
+        # Reduce the signals to at most two points per horizontal pixel before handing them to matplotlib.
+        # The full-resolution signals remain available in 'recorded_samples'.
+        plot_bins = max(int(plt.gca().get_window_extent().width), 1)
+        (ch1_t, ch1_samples) = decimate_minmax(t, recorded_samples[:, CH1], plot_bins)
+        (ch2_t, ch2_samples) = decimate_minmax(t, recorded_samples[:, CH2], plot_bins)
 
-        plt.title("AnalogIn acquisition #{}\n{} samples ({} seconds at {} Hz)\nsignal frequency: {} Hz".format(
-            acquisition_nr, num_samples, record_length, sample_frequency, signal_frequency))
+        title_text = (f"AnalogIn acquisition #{acquisition_nr}\n"
+                      f"{num_samples} samples ({record_length} seconds at {sample_frequency} Hz)\n"
+                      f"signal frequency: {signal_frequency} Hz")
 
         if ch1_line is None:
 
             # This is the first time we plot acquisition data.
 
+            title = plt.title(title_text)
+
             plt.grid()
 
             if trigger_flag:
@@ -238,27 +345,63 @@ def run_demo(analogIn, sample_frequency, record_length, trigger_flag, signal_fre
                 plt.axvline(0.0, c='r')
                 plt.axhline(trigger_level, c='r')
 
-            (ch1_line, ) = plt.plot(t, samples[:, CH1], color='#346f9f', label="channel 1 (cos)")
-            (ch2_line, ) = plt.plot(t, samples[:, CH2], color='#ffdd56', label="channel 2 (sin)")
+            (ch1_line, ) = plt.plot(ch1_t, ch1_samples, color='#346f9f', label="channel 1 (cos)")
+            (ch2_line, ) = plt.plot(ch2_t, ch2_samples, color='#ffdd56', label="channel 2 (sin)")
 
             plt.legend(loc="upper right")
+
+            plt.show(block=False)
+
+            # From now on, only redraw the title and the signal lines.
+            blitted_plot = BlittedPlot(plt.gcf(), [title, ch1_line, ch2_line])
         else:
 
-            # The plot is already available. Just update the acquisition data.
+            # The plot is already available. Just update the title and the acquisition data.
 
-            ch1_line.set_xdata(t)
-            ch1_line.set_ydata(samples[:, CH1])
+            title.set_text(title_text)
 
-            ch2_line.set_xdata(t)
-            ch2_line.set_ydata(samples[:, CH2])
+            ch1_line.set_data(ch1_t, ch1_samples)
+            ch2_line.set_data(ch2_t, ch2_samples)
 
-        plt.pause(1e-3)
+        blitted_plot.update()
 
-        if len(plt.get_fignums()) == 0:
+        if blitted_plot.closed:
             # User has closed the window, finish.
             break
 
 
+def run_demos(device, args) -> None:
+    """Configure the analog output signals and run the record-mode demo on an open device."""
+
+    analogOut = device.analogOut
+    analogIn  = device.analogIn
+
+    # We want to see 5 full cycles in the acquisition window.
+    analog_out_frequency = 5 / args.record_length
+
+    # Signal amplitude in Volt.
+    # The AnalogOut instrument can do 10 Vpp centered around 0 V.
+    # However, we use the AnalogIn instrument with a ~ 5 Vpp range centered around 0 V,
+    #   so for our example we set the analog output signal amplitude to 2.5 V.
+    analog_out_amplitude = 2.5
+
+    # Signal offset in Volt.
+    analog_out_offset = 0.0
+
+    print("Configuring analog output signals ({} Hz) ...".format(analog_out_frequency))
+
+    configure_analog_output(analogOut, analog_out_frequency, analog_out_amplitude, analog_out_offset)
+
+    time.sleep(2.0)  # Wait for a bit to ensure the stability of the analog output signals.
+
+    run_demo(analogIn,
+             args.sample_frequency,
+             args.record_length,
+             args.trigger,
+             analog_out_frequency,
+             analog_out_amplitude)
+
+
 def main():
     """Parse arguments and start demo."""
 
@@ -296,8 +439,18 @@ def main():
             help="disable triggering (default: enabled)"
         )
 
+    parser.add_argument(
+            "--connect",
+            action="store_true",
+            help="run the demo on the device kept open by a running dwf_daemon.py, rather than opening a device"
+        )
+
     args = parser.parse_args()
 
+    if args.connect:
+        run_on_daemon("AnalogInRecordMode", "run_demos", args)
+        return
+
     dwf = DwfLibrary()
 
     def maximize_analog_in_buffer_size(configuration_parameters):
@@ -309,33 +462,7 @@ def main():
         with openDwfDevice(dwf, serial_number_filter=args.serial_number_filter,
                            score_func=maximize_analog_in_buffer_size) as device:
 
-            analogOut = device.analogOut
-            analogIn  = device.analogIn
-
-            # We want to see 5 full cycles in the acquisition window.
-            analog_out_frequency = 5 / args.record_length
-
-            # Signal amplitude in Volt.
-            # The AnalogOut instrument can do 10 Vpp centered around 0 V.
-            # However, we use the AnalogIn instrument with a ~ 5 Vpp range centered around 0 V,
-            #   so for our example we set the analog output signal amplitude to 2.5 V.
-            analog_out_amplitude = 2.5
-
-            # Signal offset in Volt.
-            analog_out_offset = 0.0
-
-            print("Configuring analog output signals ({} Hz) ...".format(analog_out_frequency))
-
-            configure_analog_output(analogOut, analog_out_frequency, analog_out_amplitude, analog_out_offset)
-
-            time.sleep(2.0)  # Wait for a bit to ensure the stability of the analog output signals.
-
-            run_demo(analogIn,
-                     args.sample_frequency,
-                     args.record_length,
-                     args.trigger,
-                     analog_out_frequency,
-                     analog_out_amplitude)
+            run_demos(device, args)
 
     except PyDwfError as exception:
         print("PyDwfError:", exception)
@@ -4,48 +4,22 @@
 
 import argparse
 import time
+import numpy as np
 import matplotlib.pyplot as plt
 
-from pydwf import (DwfLibrary, DwfEnumConfigInfo, DwfAnalogOutNode, DwfAnalogOutFunction, DwfAcquisitionMode,
-                   DwfAnalogInFilter, PyDwfError)
+from pydwf import DwfLibrary, DwfEnumConfigInfo, DwfAcquisitionMode, DwfAnalogInFilter, PyDwfError
 from pydwf.utilities import openDwfDevice
 
+from analog_in_demo_utilities import configure_analog_output
+from plot_utilities import BlittedPlot
+from dwf_daemon import run_on_daemon
 
-def configure_analog_output(analogOut, analog_out_frequency, analog_out_amplitude, analog_out_offset):
-    """Configure a cosine signal on channel 1, and a sine signal on channel 2."""
 
-    # pylint: disable = too-many-branches
-
-    CH1 = 0  # This channel will carry a 'cosine' (i.e., precede channel 2 by 90 degrees).
-    CH2 = 1  # This channel will carry a 'sine'.
-
-    node = DwfAnalogOutNode.Carrier
-
-    analogOut.reset(-1)  # Reset both channels.
-
-    analogOut.nodeEnableSet   (CH1, node, True)
-    analogOut.nodeFunctionSet (CH1, node, DwfAnalogOutFunction.Sine)
-    analogOut.nodeFrequencySet(CH1, node, analog_out_frequency)
-    analogOut.nodeAmplitudeSet(CH1, node, analog_out_amplitude)
-    analogOut.nodeOffsetSet   (CH1, node, analog_out_offset)
-    analogOut.nodePhaseSet    (CH1, node, 90.0)
-
-    analogOut.nodeEnableSet   (CH2, node, True)
-    analogOut.nodeFunctionSet (CH2, node, DwfAnalogOutFunction.Sine)
-    analogOut.nodeFrequencySet(CH2, node, analog_out_frequency)
-    analogOut.nodeAmplitudeSet(CH2, node, analog_out_amplitude)
-    analogOut.nodeOffsetSet   (CH2, node, analog_out_offset)
-    analogOut.nodePhaseSet    (CH2, node, 0.0)
-
-    # Synchronize second channel to first channel. This ensures that they will start simultaneously.
-    analogOut.masterSet(CH2, CH1)
+def run_demo(analogIn, scan_mode: str, sample_frequency: float, num_samples: int):
+    """Configure the analog input, and perform repeated acquisitions and present them graphically.
 
-    # Start output on first (and second) channel.
-    analogOut.configure(CH1, True)
-
-
-def run_demo(analogIn, scan_mode: str, sample_frequency: float):
-    """Configure the analog input, and perform repeated acquisitions and present them graphically."""
+    The number of samples per acquisition is the AnalogIn buffer size, as queried once by the caller.
+    """
 
     # pylint: disable = too-many-branches
 
@@ -71,52 +45,94 @@ def run_demo(analogIn, scan_mode: str, sample_frequency: float):
     analogIn.acquisitionModeSet(acquisition_mode)
     analogIn.frequencySet(sample_frequency)
 
-    # Calculate number of samples for each acquisition.
-    num_samples = analogIn.bufferSizeGet()
+    # The sample index axis is the same for each acquisition.
+    sample_index = np.arange(num_samples)
 
-    analogIn.configure(False, True)  # Start acquisition sequence.
+    # Preallocate a single buffer that receives the samples of both channels.
+    samples = np.empty((num_samples, len(channels)), dtype=np.float64)
 
-    p1 = None
-    p2 = None
-    vline = None
+    analogIn.configure(False, True)  # Start acquisition sequence.
 
     plt.title("acquisition mode: {}".format(acquisition_mode.name))
     plt.xlabel("samples [-]")
     plt.ylabel("signals [V]")
     plt.ylim(-3, +3)
 
+    p1 = None
+    p2 = None
+    vline = None
+    blitted_plot = None
+
     while True:
 
         analogIn.status(True)
 
-        c1 = analogIn.statusData(CH1, num_samples)
+        # Fetch both channels from the data transferred by the single status() call above.
+        for (column, channel_index) in enumerate(channels):
+            samples[:, column] = analogIn.statusData(channel_index, num_samples)
+
+        if acquisition_mode == DwfAcquisitionMode.ScanScreen:
+            write_index = analogIn.statusIndexWrite()
 
         if p1 is None:
-            (p1, ) = plt.plot(c1, '.', label="CH1")
-        else:
-            p1.set_ydata(c1)
 
-        c2 = analogIn.statusData(CH2, num_samples)
-        if p2 is None:
-            (p2, ) = plt.plot(c2, '.', label="CH2")
+            # This is the first time we plot acquisition data.
+
+            (p1, ) = plt.plot(sample_index, samples[:, CH1], '.', label="CH1")
+            (p2, ) = plt.plot(sample_index, samples[:, CH2], '.', label="CH2")
             plt.legend(loc="upper left")
-        else:
-            p2.set_ydata(c2)
 
-        if acquisition_mode == DwfAcquisitionMode.ScanScreen:
-            write_index = analogIn.statusIndexWrite()
-            if vline is None:
+            if acquisition_mode == DwfAcquisitionMode.ScanScreen:
                 vline = plt.axvline(write_index, c='red')
-            else:
+
+            plt.show(block=False)
+
+            # From now on, only redraw the signals and the write index marker.
+            blitted_plot = BlittedPlot(plt.gcf(), [artist for artist in (p1, p2, vline) if artist is not None])
+        else:
+
+            # The plot is already available. Just update the acquisition data.
+
+            p1.set_ydata(samples[:, CH1])
+            p2.set_ydata(samples[:, CH2])
+
+            if vline is not None:
                 vline.set_xdata(write_index)
 
-        plt.pause(1e-3)
+        blitted_plot.update()
 
-        if len(plt.get_fignums()) == 0:
+        if blitted_plot.closed:
             # User has closed the window, finish.
             break
 
 
+def run_demos(device, args) -> None:
+    """Configure the analog output signals and run the scan-mode demo on an open device."""
+
+    analogOut = device.analogOut
+    analogIn  = device.analogIn
+
+    # The acquisition window is the full AnalogIn buffer. Its size is a device property; query it once.
+    buffer_size = analogIn.bufferSizeGet()
+
+    # We want to see 2.5 full cycles in the acquisition window.
+    analog_out_frequency = 2.5 * args.sample_frequency / buffer_size
+
+    # Signal amplitude in Volt. The AnalogOut instrument can do 5 Vpp, so 2.5 V amplitude is the maximum.
+    analog_out_amplitude = 2.5
+
+    # Signal offset in Volt.
+    analog_out_offset = 0.0
+
+    print("Configuring analog output signals ({} Hz) ...".format(analog_out_frequency))
+
+    configure_analog_output(analogOut, analog_out_frequency, analog_out_amplitude, analog_out_offset)
+
+    time.sleep(2.0)  # Wait for a bit to ensure the stability of the analog output signals.
+
+    run_demo(analogIn, args.scan_mode, args.sample_frequency, buffer_size)
+
+
 def main():
     """Parse arguments and start demo."""
 
@@ -149,8 +165,18 @@ def main():
             help="scan mode (default: {})".format(DEFAULT_ACQUISITION_MODE)
         )
 
+    parser.add_argument(
+            "--connect",
+            action="store_true",
+            help="run the demo on the device kept open by a running dwf_daemon.py, rather than opening a device"
+        )
+
     args = parser.parse_args()
 
+    if args.connect:
+        run_on_daemon("AnalogInShiftScanShiftScreenDemo", "run_demos", args)
+        return
+
     dwf = DwfLibrary()
 
     def maximize_analog_in_buffer_size(configuration_parameters):
@@ -161,25 +187,7 @@ def main():
         with openDwfDevice(dwf, serial_number_filter=args.serial_number_filter,
                            score_func=maximize_analog_in_buffer_size) as device:
 
-            analogOut = device.analogOut
-            analogIn  = device.analogIn
-
-            # We want to see 2.5 full cycles in the acquisition window.
-            analog_out_frequency = 2.5 * args.sample_frequency / analogIn.bufferSizeGet()
-
-            # Signal amplitude in Volt. The AnalogOut instrument can do 5 Vpp, so 2.5 V amplitude is the maximum.
-            analog_out_amplitude = 2.5
-
-            # Signal offset in Volt.
-            analog_out_offset = 0.0
-
-            print("Configuring analog output signals ({} Hz) ...".format(analog_out_frequency))
-
-            configure_analog_output(analogOut, analog_out_frequency, analog_out_amplitude, analog_out_offset)
-
-            time.sleep(2.0)  # Wait for a bit to ensure the stability of the analog output signals.
-
-            run_demo(analogIn, args.scan_mode, args.sample_frequency)
+            run_demos(device, args)
     except PyDwfError as exception:
         print("PyDwfError:", exception)
 
@@ -3,13 +3,15 @@
 """Demonstrate the simplest possible use of the AnalogIn instrument."""
 
 import argparse
-import time
+import asyncio
 
 from pydwf import DwfLibrary, PyDwfError
 from pydwf.utilities import openDwfDevice
 
+from dwf_daemon import run_on_daemon
 
-def demo_analog_input_instrument_api_simple(analogIn):
+
+async def demo_analog_input_instrument_api_simple(analogIn, period: float):
     """Demonstrate the simplest possible use of the analog input channels.
 
     This demonstration simply calls the status() function of the AnalogIn instrument, with the 'readData' argument
@@ -18,6 +20,9 @@ def demo_analog_input_instrument_api_simple(analogIn):
 
     This straightforward way of querying the current AnalogIn voltages may be sufficient for simple applications that
     have no strict requirement on sample timing and triggering.
+
+    The demo is implemented as a coroutine that polls the instrument once every 'period' seconds. The blocking
+    status() call is run in the default executor, so other asyncio tasks can run alongside this demo.
     """
 
     channel_count = analogIn.channelCount()
@@ -27,11 +32,20 @@ def demo_analog_input_instrument_api_simple(analogIn):
 
     analogIn.reset()
 
+    loop = asyncio.get_running_loop()
+
     while True:
-        analogIn.status(False)
-        print("analog input", ", ".join("channel {}: {:25.20f} [V]".format(
-            channel_index, analogIn.statusSample(channel_index)) for channel_index in range(channel_count)))
-        time.sleep(0.010)
+        await loop.run_in_executor(None, analogIn.status, False)
+        channel_samples = [analogIn.statusSample(channel_index) for channel_index in range(channel_count)]
+        print("analog input", ", ".join("channel {}: {:25.20f} [V]".format(channel_index, channel_sample)
+                                        for (channel_index, channel_sample) in enumerate(channel_samples)))
+        await asyncio.sleep(period)
+
+
+def run_demos(device, args) -> None:
+    """Run the simple AnalogIn demo on an open device."""
+    # Note that asyncio.run() cancels the demo task on CTRL-C, then raises KeyboardInterrupt.
+    asyncio.run(demo_analog_input_instrument_api_simple(device.analogIn, args.period))
 
 
 def main():
@@ -39,6 +53,8 @@ def main():
 
     parser = argparse.ArgumentParser(description="Demonstrate simplest possible AnalogIn instrument usage.")
 
+    DEFAULT_PERIOD = 0.010
+
     parser.add_argument(
             "-sn", "--serial-number-filter",
             type=str,
@@ -47,12 +63,29 @@ def main():
             help="serial number filter to select a specific Digilent Waveforms device"
         )
 
+    parser.add_argument(
+            "-p", "--period",
+            type=float,
+            default=DEFAULT_PERIOD,
+            help="polling period, in seconds (default: {} s)".format(DEFAULT_PERIOD)
+        )
+
+    parser.add_argument(
+            "--connect",
+            action="store_true",
+            help="run the demo on the device kept open by a running dwf_daemon.py, rather than opening a device"
+        )
+
     args = parser.parse_args()
 
+    if args.connect:
+        run_on_daemon("AnalogInSimple", "run_demos", args)
+        return
+
     try:
         dwf = DwfLibrary()
         with openDwfDevice(dwf, serial_number_filter=args.serial_number_filter) as device:
-            demo_analog_input_instrument_api_simple(device.analogIn)
+            run_demos(device, args)
     except PyDwfError as exception:
         print("PyDwfError:", exception)
     except KeyboardInterrupt:
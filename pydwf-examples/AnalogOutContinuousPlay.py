@@ -3,90 +3,226 @@
 """This demo shows continuous, synchronized sample playback on two channels."""
 
 import argparse
+import math
+import time
 import numpy as np
 
 from pydwf import DwfLibrary, DwfEnumConfigInfo, DwfAnalogOutNode, DwfAnalogOutFunction, DwfState, PyDwfError
 from pydwf.utilities import openDwfDevice
 
 
-class CircleSampler:
-    """This sampler generates XY samples for a circular shape on demand."""
+PHASE_RAMP_BLOCK_SIZE = 1024
+
+
+class XYSampler:
+    """Base class for samplers that produce XY samples into preallocated output buffers.
+
+    The output buffers are reused by each call to fill(), so the samples returned by fill() are only
+    valid until the next call. Intermediate results go into scratch buffers that are also reused, so
+    producing a block of samples does not allocate memory once the buffers have reached their final size.
+
+    The samplers do their arithmetic in single precision, which is much faster than double precision for
+    the sine and cosine calculations, and more than accurate enough for the DAC. The output buffers are
+    double precision, because that is what nodePlayData() expects.
+
+    To keep single precision accurate, the samplers never calculate the phase of a sample from its absolute
+    sample index. Instead, they keep track of the phase of the next sample, reduced to a single period, in
+    double precision, and use phase_ramp() or cos_sin_ramp() to calculate the values for the samples that
+    follow it.
+    """
 
     # pylint: disable=too-few-public-methods
 
-    def __init__(self, channel: str, sample_frequency: float, refresh_frequency: float):
-        self.channel = channel
-        self.sample_frequency = sample_frequency
-        self.refresh_frequency = refresh_frequency
-        self.k = 0  # sample index
+    def __init__(self, max_samples: int):
+        self.x_samples = np.empty(max_samples)
+        self.y_samples = np.empty(max_samples)
+        self._scratch = {}
+        self._tables = {}
 
-    def get_samples(self, n: int):
-        """Produce samples."""
-        t = np.arange(self.k, self.k + n) / self.sample_frequency
-        self.k += n
+    def output_buffers(self, n: int):
+        """Return the X and Y output buffers for n samples, growing them if needed."""
+        if n > len(self.x_samples):
+            self.x_samples = np.empty(n)
+            self.y_samples = np.empty(n)
+        return (self.x_samples[:n], self.y_samples[:n])
 
-        if self.channel == 'x':
-            return np.cos(t * self.refresh_frequency * 2 * np.pi)
+    def scratch(self, key: str, n: int, dtype=np.float32):
+        """Return the scratch buffer with the given key for n values, growing it if needed."""
+        buffer = self._scratch.get(key)
+        if buffer is None or len(buffer) < n:
+            buffer = self._scratch[key] = np.empty(n, dtype=dtype)
+        return buffer[:n]
 
-        if self.channel == 'y':
-            return np.sin(t * self.refresh_frequency * 2 * np.pi)
+    def cos_sin_ramp(self, key: str, scale: float, offset: float, out_cos, out_sin):
+        """Calculate the cosine and sine of (offset + i * scale) for i in range(n), into 'out_cos' and 'out_sin'.
 
-        raise ValueError()
+        Successive blocks of such values only differ by a rotation. We calculate the cosine and sine of the
+        (i * scale) values once, and produce each block by rotating these tables over 'offset'. This takes a
+        handful of multiply-adds per value, and no sine or cosine calculations at all.
 
+        Because the tables are exact and the offset is tracked separately, rotation errors do not accumulate.
+        """
+        n = len(out_cos)
 
-class RotatingPolygonSampler:
-    """This sampler generates XY samples for a polygon shape on demand."""
+        tables = self._tables.get(key)
+        if tables is None or len(tables[0]) < n:
+            angle = np.arange(n) * scale
+            tables = self._tables[key] = (np.cos(angle).astype(np.float32), np.sin(angle).astype(np.float32))
+
+        cos_table = tables[0][:n]
+        sin_table = tables[1][:n]
+
+        cos_offset = np.float32(math.cos(offset))
+        sin_offset = np.float32(math.sin(offset))
+
+        temp1 = self.scratch('rotate1', n)
+        temp2 = self.scratch('rotate2', n)
+
+        np.multiply(cos_table, cos_offset, out=temp1)
+        np.multiply(sin_table, sin_offset, out=temp2)
+        np.subtract(temp1, temp2, out=out_cos)
+
+        np.multiply(sin_table, cos_offset, out=temp1)
+        np.multiply(cos_table, sin_offset, out=temp2)
+        np.add(temp1, temp2, out=out_sin)
+
+    def phase_ramp(self, key: str, n: int, scale: float, offset: float, period: float):
+        """Return the single precision values (offset + i * scale) for i in range(n), reduced modulo 'period'.
+
+        The values are only partially reduced: each block of PHASE_RAMP_BLOCK_SIZE values starts at a reduced
+        value, and grows from there. This keeps the values small, and therefore precise in single precision,
+        without an expensive reduction of every individual value.
+        """
+        num_blocks = -(-n // PHASE_RAMP_BLOCK_SIZE)
+
+        block_offsets = np.arange(num_blocks, dtype=np.float64)
+        block_offsets *= PHASE_RAMP_BLOCK_SIZE * scale
+        block_offsets += offset
+        np.remainder(block_offsets, period, out=block_offsets)
+
+        ramp = self.scratch(key + "_ramp", PHASE_RAMP_BLOCK_SIZE)
+        ramp[:] = np.arange(PHASE_RAMP_BLOCK_SIZE)
+        ramp *= np.float32(scale)
+
+        phase = self.scratch(key, num_blocks * PHASE_RAMP_BLOCK_SIZE).reshape(num_blocks, PHASE_RAMP_BLOCK_SIZE)
+        np.add(ramp, block_offsets[:, np.newaxis], out=phase, casting='same_kind')
+
+        return phase.reshape(-1)[:n]
+
+
+class CircleSampler(XYSampler):
+    """This sampler generates XY samples for a circular shape on demand."""
 
     # pylint: disable=too-few-public-methods
 
-    def __init__(self, channel: str, sample_frequency: float, refresh_frequency: float,
-                 revolutions_per_sec: float, num_points: float, poly_step: int):
-        self.channel = channel
+    def __init__(self, sample_frequency: float, refresh_frequency: float, max_samples: int):
+        super().__init__(max_samples)
         self.sample_frequency = sample_frequency
         self.refresh_frequency = refresh_frequency
-        self.revolutions_per_sec = revolutions_per_sec
-        self.num_points = num_points
-        self.poly_step = poly_step
-        self.k = 0  # sample index
+        self.phase_offset = 0.0  # phase of the next sample, in radians
 
-    def get_samples(self, n: int):
-        """Produce samples."""
-        t = np.arange(self.k, self.k + n) / self.sample_frequency
-        self.k += n
+        # Phase increment per sample, in radians.
+        self.phase_scale = 2.0 * np.pi * refresh_frequency / sample_frequency
 
-        tt = t * self.refresh_frequency
+    def fill(self, n: int):
+        """Produce the next n samples for both the X and the Y channel."""
+        (x_samples, y_samples) = self.output_buffers(n)
 
-        residual = np.mod(tt * self.num_points, 1.0)
+        self.cos_sin_ramp('phase', self.phase_scale, self.phase_offset, x_samples, y_samples)
 
-        b = np.round(tt * self.num_points - residual)
+        self.phase_offset = (self.phase_offset + n * self.phase_scale) % (2.0 * np.pi)
 
-        h0 = (2.0 * np.pi * self.poly_step / self.num_points) * b
-        h1 = (2.0 * np.pi * self.poly_step / self.num_points) * (b + 1)
+        return (x_samples, y_samples)
 
-        x0 = np.cos(h0)
-        y0 = np.sin(h0)
 
-        x1 = np.cos(h1)
-        y1 = np.sin(h1)
+class RotatingPolygonSampler(XYSampler):
+    """This sampler generates XY samples for a polygon shape on demand."""
+
+    # pylint: disable=too-few-public-methods
 
-        x = x0 + (x1 - x0) * residual
-        y = y0 + (y1 - y0) * residual
+    def __init__(self, sample_frequency: float, refresh_frequency: float,
+                 revolutions_per_sec: float, num_points: float, poly_step: int, max_samples: int):
+        super().__init__(max_samples)
+        self.sample_frequency = sample_frequency
+        self.refresh_frequency = refresh_frequency
+        self.revolutions_per_sec = revolutions_per_sec
+        self.num_points = num_points
+        self.poly_step = poly_step
+        self.edge_offset = 0.0      # position along the polygon of the next sample, in edges
+        self.rotation_offset = 0.0  # rotation angle of the next sample, in radians
+
+        # The polygon only has 'num_points' distinct vertices. Calculate their coordinates once, rather than
+        # evaluating the sine and cosine of the vertex angles for every sample. We also tabulate the edges,
+        # i.e., the difference between each vertex and the next one.
+        vertex_angles = (2.0 * np.pi * poly_step / num_points) * np.arange(num_points + 1)
+        vertex_angles[-1] = 0.0
+        vertex_x = np.cos(vertex_angles).astype(np.float32)
+        vertex_y = np.sin(vertex_angles).astype(np.float32)
+
+        self.vertex_x = vertex_x[:-1]
+        self.vertex_y = vertex_y[:-1]
+        self.edge_x = np.diff(vertex_x)
+        self.edge_y = np.diff(vertex_y)
+
+        # Increments per sample of the position along the polygon (in edges), and of the rotation angle (in radians).
+        self.edge_scale = refresh_frequency * num_points / sample_frequency
+        self.rotation_scale = 2.0 * np.pi * revolutions_per_sec / sample_frequency
+
+    def fill(self, n: int):
+        """Produce the next n samples for both the X and the Y channel."""
+        (x_samples, y_samples) = self.output_buffers(n)
+
+        self._fill_vectorized(x_samples, y_samples)
+
+        self.edge_offset = (self.edge_offset + n * self.edge_scale) % self.num_points
+        self.rotation_offset = (self.rotation_offset + n * self.rotation_scale) % (2.0 * np.pi)
+
+        return (x_samples, y_samples)
+
+    def _fill_vectorized(self, x_samples, y_samples):
+        """Calculate a block of samples using vectorized operations."""
+        n = len(x_samples)
+
+        # Split the position along the polygon into the index of the edge we're on (b), and the fractional
+        # position along that edge (residual).
+        u = self.phase_ramp('u', n, self.edge_scale, self.edge_offset, self.num_points)
+        b = np.floor(u, out=self.scratch('b', n))
+        residual = np.subtract(u, b, out=self.scratch('residual', n))
+
+        # Index of the polygon vertex that we're moving away from.
+        vertex_index = self.scratch('vertex_index', n, dtype=np.intp)
+        np.copyto(vertex_index, b, casting='unsafe')
+        np.remainder(vertex_index, self.num_points, out=vertex_index)
+
+        # Interpolate along the edge.
+        x = np.take(self.edge_x, vertex_index, out=self.scratch('x', n))
+        y = np.take(self.edge_y, vertex_index, out=self.scratch('y', n))
+        x *= residual
+        y *= residual
+        x += np.take(self.vertex_x, vertex_index, out=self.scratch('temp1', n))
+        y += np.take(self.vertex_y, vertex_index, out=self.scratch('temp1', n))
 
         # rotate (x, y) by (revolutions_per_sec * t) revolutions.
 
-        h = 2 * np.pi * self.revolutions_per_sec * t
+        cos_h = self.scratch('cos_h', n)
+        sin_h = self.scratch('sin_h', n)
+
+        self.cos_sin_ramp('h', self.rotation_scale, self.rotation_offset, cos_h, sin_h)
 
-        if self.channel == 'x':
-            return np.cos(h) * x - np.sin(h) * y
+        temp1 = self.scratch('temp1', n)
+        temp2 = self.scratch('temp2', n)
 
-        if self.channel == 'y':
-            return np.sin(h) * x + np.cos(h) * y
+        np.multiply(cos_h, x, out=temp1)
+        np.multiply(sin_h, y, out=temp2)
+        np.subtract(temp1, temp2, out=x_samples)
 
-        raise ValueError()
+        np.multiply(sin_h, x, out=temp1)
+        np.multiply(cos_h, y, out=temp2)
+        np.add(temp1, temp2, out=y_samples)
 
 
 def demo_analog_output_instrument_api(analogOut, shape, sample_frequency,
-                                      refresh_frequency, revolutions_per_sec, num_points, poly_step):
+                                      refresh_frequency, revolutions_per_sec, num_points, poly_step, verbose):
     """Demonstrate the analog output API.
 
     This demo produces a shape on the first two analog output channels that can be viewed
@@ -106,15 +242,17 @@ def demo_analog_output_instrument_api(analogOut, shape, sample_frequency,
     CH1 = 0
     CH2 = 1
 
-    # The samplers for a given shape return the requested number of samples on demand, for the given channel.
+    # The number of free samples reported by the channels never exceeds their maximum play buffer size.
+    # The samplers preallocate their output buffers to that size.
+    max_samples = max(analogOut.nodeDataInfo(channel_index, DwfAnalogOutNode.Carrier)[1]
+                      for channel_index in (CH1, CH2))
+
+    # The sampler for a given shape returns the requested number of samples on demand, for both channels.
     if shape == 'circle':
-        sampler_ch1 = CircleSampler('x', sample_frequency, refresh_frequency)
-        sampler_ch2 = CircleSampler('y', sample_frequency, refresh_frequency)
+        sampler = CircleSampler(sample_frequency, refresh_frequency, max_samples)
     elif shape == 'poly':
-        sampler_ch1 = RotatingPolygonSampler(
-            'x', sample_frequency, refresh_frequency, revolutions_per_sec, num_points, poly_step)
-        sampler_ch2 = RotatingPolygonSampler(
-            'y', sample_frequency, refresh_frequency, revolutions_per_sec, num_points, poly_step)
+        sampler = RotatingPolygonSampler(
+            sample_frequency, refresh_frequency, revolutions_per_sec, num_points, poly_step, max_samples)
 
     analogOut.nodeEnableSet(CH1, DwfAnalogOutNode.Carrier, True)
     analogOut.nodeFunctionSet(CH1, DwfAnalogOutNode.Carrier, DwfAnalogOutFunction.Play)
@@ -127,42 +265,67 @@ def demo_analog_output_instrument_api(analogOut, shape, sample_frequency,
     # Configure CH2 to follow CH1.
     analogOut.masterSet(CH2, CH1)
 
+    # Load a full buffer of samples before starting, so the channels do not run dry while we produce the first
+    # refill. This first call also sizes all of the sampler's tables and scratch buffers, so refills during
+    # playback do not have to.
+    (data_ch1, data_ch2) = sampler.fill(max_samples)
+    analogOut.nodeDataSet(CH1, DwfAnalogOutNode.Carrier, data_ch1)
+    analogOut.nodeDataSet(CH2, DwfAnalogOutNode.Carrier, data_ch2)
+
     analogOut.configure(CH1, True)  # Start channels 1 and 2.
 
+    # We top up the channels once at least 2048 samples are free. When that is not yet the case, we sleep for
+    # a quarter of the time the channels take to play 2048 samples, rather than polling the device continuously.
+    min_feed = 2048
+    idle_sleep_duration = max(0.25 * min_feed / sample_frequency, 0.001)
+
+    # Lost and corrupted sample counts are accumulated, and reported at most once per second.
+    report_interval = 1.0
+    next_report_time = time.monotonic() + report_interval
+    (ch1_total_lost, ch1_total_corrupted, ch2_total_lost, ch2_total_corrupted) = (0, 0, 0, 0)
+
     while True:
 
+        # The status() calls refresh the play status of the channels; they must not be part of the assertion.
         ch1_status = analogOut.status(CH1)
         ch2_status = analogOut.status(CH2)
 
         assert (ch1_status == DwfState.Triggered) and (ch2_status == DwfState.Triggered)
 
-        (ch1_data_free, ch1_data_lost, ch1_data_corrupted) = analogOut.nodePlayStatus(CH1, DwfAnalogOutNode.Carrier)
-        (ch2_data_free, ch2_data_lost, ch2_data_corrupted) = analogOut.nodePlayStatus(CH2, DwfAnalogOutNode.Carrier)
-
-        if ch1_data_lost != 0 or ch1_data_corrupted != 0 or ch2_data_lost != 0 or ch2_data_corrupted != 0:
-            print("ch1 status: {:10} {:10} {:10} ch2 status: {:10} {:10} {:10}".format(
-                ch1_data_free, ch1_data_lost, ch1_data_corrupted,
-                ch2_data_free, ch2_data_lost, ch2_data_corrupted))
-
-        feed_ch1 = 0
-        feed_ch2 = 0
-
-        if ch1_data_free > ch2_data_free:
-            if ch1_data_free >= 2048:
-                feed_ch1 = ch1_data_free
+        # The play status is a (free, lost, corrupted) tuple. Normally, only the number of free samples is of
+        # interest; the lost and corrupted counts are only unpacked when they are not zero.
+        ch1_play_status = analogOut.nodePlayStatus(CH1, DwfAnalogOutNode.Carrier)
+        ch2_play_status = analogOut.nodePlayStatus(CH2, DwfAnalogOutNode.Carrier)
+
+        if ch1_play_status[1] or ch1_play_status[2] or ch2_play_status[1] or ch2_play_status[2]:
+            (_, ch1_data_lost, ch1_data_corrupted) = ch1_play_status
+            (_, ch2_data_lost, ch2_data_corrupted) = ch2_play_status
+            ch1_total_lost += ch1_data_lost
+            ch1_total_corrupted += ch1_data_corrupted
+            ch2_total_lost += ch2_data_lost
+            ch2_total_corrupted += ch2_data_corrupted
+
+        if ch1_total_lost != 0 or ch1_total_corrupted != 0 or ch2_total_lost != 0 or ch2_total_corrupted != 0:
+            now = time.monotonic()
+            if now >= next_report_time:
+                print("ch1 lost/corrupted: {:10} {:10} ch2 lost/corrupted: {:10} {:10}".format(
+                    ch1_total_lost, ch1_total_corrupted, ch2_total_lost, ch2_total_corrupted))
+                (ch1_total_lost, ch1_total_corrupted, ch2_total_lost, ch2_total_corrupted) = (0, 0, 0, 0)
+                next_report_time = now + report_interval
+
+        # Both channels play samples at the same rate. We feed them in lockstep, so the sampler can produce
+        # the samples for both channels in a single pass.
+        feed = min(ch1_play_status[0], ch2_play_status[0])
+
+        if feed >= min_feed:
+            if verbose:
+                print("Transferring {} samples to channels 1 and 2.".format(feed))
+            # Note that nodePlayData() copies the samples, so the sampler can reuse its buffers on the next call.
+            (data_ch1, data_ch2) = sampler.fill(feed)
+            analogOut.nodePlayData(CH1, DwfAnalogOutNode.Carrier, data_ch1)
+            analogOut.nodePlayData(CH2, DwfAnalogOutNode.Carrier, data_ch2)
         else:
-            if ch2_data_free >= 2048:
-                feed_ch2 = ch2_data_free
-
-        if feed_ch1 > 0:
-            print("Transferring {} samples to channel 1.".format(feed_ch1))
-            data = sampler_ch1.get_samples(feed_ch1)
-            analogOut.nodePlayData(CH1, DwfAnalogOutNode.Carrier, data)
-
-        if feed_ch2 > 0:
-            print("Transferring {} samples to channel 2.".format(feed_ch2))
-            data = sampler_ch2.get_samples(feed_ch2)
-            analogOut.nodePlayData(CH2, DwfAnalogOutNode.Carrier, data)
+            time.sleep(idle_sleep_duration)
 
 
 def main():
@@ -234,6 +397,13 @@ def main():
             help="poly mode only: steps to the next poly point (default: {})".format(DEFAULT_POLY_STEP)
         )
 
+    parser.add_argument(
+            "-v", "--verbose",
+            action="store_true",
+            dest="verbose",
+            help="report each transfer of samples to the channels"
+        )
+
     args = parser.parse_args()
 
     try:
@@ -252,7 +422,8 @@ def main():
                 args.refresh_frequency,
                 args.revolutions_per_sec,
                 args.num_points,
-                args.poly_step)
+                args.poly_step,
+                args.verbose)
     except PyDwfError as exception:
         print("PyDwfError:", exception)
     except KeyboardInterrupt:
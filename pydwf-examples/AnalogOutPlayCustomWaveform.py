@@ -3,6 +3,7 @@
 """This demo shows analog output of a custom waveform."""
 
 import argparse
+import os
 
 import numpy as np
 
@@ -11,6 +12,48 @@ from pydwf import (DwfLibrary, DwfEnumConfigInfo, DwfAnalogOutIdle, DwfTriggerSo
 from pydwf.utilities import openDwfDevice
 
 
+def load_waveform(filename: str):
+    """Load a waveform from a file.
+
+    Parsing text is slow for large waveforms. Binary files are read directly:
+
+    * files with a '.npy' extension are loaded as NumPy arrays (memory-mapped);
+    * files with a '.bin' or '.f32' extension are read as raw little-endian 32-bit floating point numbers;
+    * all other files are parsed as ASCII floating point numbers.
+    """
+    extension = os.path.splitext(filename)[1].lower()
+
+    if extension == ".npy":
+        return np.load(filename, mmap_mode='r')
+
+    if extension in (".bin", ".f32"):
+        return np.fromfile(filename, dtype='<f4')
+
+    return np.loadtxt(filename)
+
+
+def default_waveform(num_samples: int):
+    """Construct a mildly interesting waveform in the [-2.0 .. 4.0] V range.
+
+    The waveform is (-2.0 + 6.0 * w * y), with w = 0.5 * (1 + cos(11 * pi * x)) and y = 0.5 * (1 + cos(pi * x)),
+    for x in the range [-1, 1]. It is evaluated in place, in two arrays.
+    """
+    pi_x = np.linspace(-np.pi, np.pi, num_samples)
+
+    waveform = np.multiply(pi_x, 11.0)
+    np.cos(waveform, out=waveform)
+    waveform += 1.0
+
+    np.cos(pi_x, out=pi_x)
+    pi_x += 1.0
+
+    waveform *= pi_x
+    waveform *= 1.5
+    waveform -= 2.0
+
+    return waveform
+
+
 def demo_custom_analog_out_waveform(analogOut, waveform, waveform_duration, wait_duration):
     """Put the given waveform on the first analog output channel."""
 
@@ -34,7 +77,8 @@ def demo_custom_analog_out_waveform(analogOut, waveform, waveform_duration, wait
     analogOut.nodeAmplitudeSet(channel, node, amplitude_max)
     analogOut.nodeOffsetSet(channel, node, 0.0)
 
-    samples = waveform / amplitude_max
+    # Scale the waveform by multiplying with the reciprocal, which is cheaper than dividing each sample.
+    samples = np.multiply(waveform, 1.0 / amplitude_max)
     analogOut.nodeDataSet(channel, node, samples)
 
     # Wait duration before each waveform emission.
@@ -91,19 +135,17 @@ def main():
             type=str,
             default=None,
             dest="filename",
-            help="file containing the waveform as ASCII floating point numbers (default: none)"
+            help="file containing the waveform as ASCII floating point numbers, as a NumPy array ('.npy'),"
+                 " or as raw 32-bit floats ('.bin', '.f32'); the binary formats load much faster (default: none)"
         )
 
     args = parser.parse_args()
 
     if args.filename is not None:
-        waveform = np.loadtxt(args.filename)
+        waveform = load_waveform(args.filename)
     else:
         # If no filename is given, construct a mildly interesting waveform in the [-2.0 .. 4.0] V range.
-        x = np.linspace(-1, 1, 10000)
-        w = 0.5 * (1 + np.cos(11 * np.pi*x))
-        y = 0.5 * (1 + np.cos(     np.pi*x))
-        waveform = -2.0 + w * y * 6.0
+        waveform = default_waveform(10000)
 
     try:
         dwf = DwfLibrary()
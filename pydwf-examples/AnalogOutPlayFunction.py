@@ -4,15 +4,20 @@
 
 import argparse
 
-from analog_output_node_utilities import AnalogOutNodeSettings
+from analog_output_node_utilities import (AnalogOutNodeSettings, apply_analog_output_node_settings,
+                                          get_analog_output_node_settings)
 
 from pydwf import DwfLibrary, DwfAnalogOutNode, DwfAnalogOutFunction, PyDwfError, DwfDeviceParameter
 from pydwf.utilities import openDwfDevice
 
 
-def demo_analog_output_instrument_api(analogOut, continue_playing: bool,
+def demo_analog_output_instrument_api(analogOut, continue_playing: bool, verify: bool,
                                       ch1_settings: AnalogOutNodeSettings, ch2_settings: AnalogOutNodeSettings):
-    """Demonstrate the analog output API."""
+    """Demonstrate the analog output API.
+
+    If 'verify' is True, the node settings are read back from the device before they are shown.
+    Otherwise, the settings as requested are shown, which saves a device round trip per setting.
+    """
 
     channel_count = analogOut.count()
 
@@ -25,37 +30,27 @@ def demo_analog_output_instrument_api(analogOut, continue_playing: bool,
     CH1 = 0
     CH2 = 1
 
-    analogOut.nodeEnableSet    (CH1, DwfAnalogOutNode.Carrier, ch1_settings.enable   )
-    analogOut.nodeFunctionSet  (CH1, DwfAnalogOutNode.Carrier, ch1_settings.function )
-    analogOut.nodeFrequencySet (CH1, DwfAnalogOutNode.Carrier, ch1_settings.frequency)
-    analogOut.nodeAmplitudeSet (CH1, DwfAnalogOutNode.Carrier, ch1_settings.amplitude)
-    analogOut.nodeOffsetSet    (CH1, DwfAnalogOutNode.Carrier, ch1_settings.offset   )
-    analogOut.nodeSymmetrySet  (CH1, DwfAnalogOutNode.Carrier, ch1_settings.symmetry )
-    analogOut.nodePhaseSet     (CH1, DwfAnalogOutNode.Carrier, ch1_settings.phase    )
+    node = DwfAnalogOutNode.Carrier
 
-    analogOut.nodeEnableSet    (CH2, DwfAnalogOutNode.Carrier, ch2_settings.enable   )
-    analogOut.nodeFunctionSet  (CH2, DwfAnalogOutNode.Carrier, ch2_settings.function )
-    analogOut.nodeFrequencySet (CH2, DwfAnalogOutNode.Carrier, ch2_settings.frequency)
-    analogOut.nodeAmplitudeSet (CH2, DwfAnalogOutNode.Carrier, ch2_settings.amplitude)
-    analogOut.nodeOffsetSet    (CH2, DwfAnalogOutNode.Carrier, ch2_settings.offset   )
-    analogOut.nodeSymmetrySet  (CH2, DwfAnalogOutNode.Carrier, ch2_settings.symmetry )
-    analogOut.nodePhaseSet     (CH2, DwfAnalogOutNode.Carrier, ch2_settings.phase    )
+    channel_settings = [(CH1, ch1_settings), (CH2, ch2_settings)]
 
-    nodes = (DwfAnalogOutNode.Carrier, )
+    apply_analog_output_node_settings(analogOut, node, channel_settings)
 
     print()
-    for node in nodes:
-        for channel_index in (CH1, CH2):
-            print("=== active settings for channel CH{}, node {!r}:".format(channel_index + 1, node.name))
-            print()
-            print("    enable ......... : {}"            .format(analogOut.nodeEnableGet   (channel_index, node)))
-            print("    function ....... : {}"            .format(analogOut.nodeFunctionGet (channel_index, node).name))
-            print("    frequency ...... : {:20.9f} [Hz]" .format(analogOut.nodeFrequencyGet(channel_index, node)))
-            print("    amplitude ...... : {:20.9f} [?]"  .format(analogOut.nodeAmplitudeGet(channel_index, node)))
-            print("    offset ......... : {:20.9f} [V]"  .format(analogOut.nodeOffsetGet   (channel_index, node)))
-            print("    symmetry ....... : {:20.9f} [%]"  .format(analogOut.nodeSymmetryGet (channel_index, node)))
-            print("    phase .......... : {:20.9f} [°]"  .format(analogOut.nodePhaseGet    (channel_index, node)))
-            print()
+    for (channel_index, settings) in channel_settings:
+        if verify:
+            settings = get_analog_output_node_settings(analogOut, channel_index, node)
+        print("=== {} settings for channel CH{}, node {!r}:".format(
+            "active" if verify else "requested", channel_index + 1, node.name))
+        print()
+        print("    enable ......... : {}"            .format(settings.enable))
+        print("    function ....... : {}"            .format(settings.function.name))
+        print("    frequency ...... : {:20.9f} [Hz]" .format(settings.frequency))
+        print("    amplitude ...... : {:20.9f} [?]"  .format(settings.amplitude))
+        print("    offset ......... : {:20.9f} [V]"  .format(settings.offset))
+        print("    symmetry ....... : {:20.9f} [%]"  .format(settings.symmetry))
+        print("    phase .......... : {:20.9f} [°]"  .format(settings.phase))
+        print()
 
     # Configure CH2 to follow CH1.
     analogOut.masterSet(CH2, CH1)
@@ -110,6 +105,13 @@ def main():
             help="configure instrument to continue playing and quit program immediately"
         )
 
+    parser.add_argument(
+            "--verify",
+            action='store_true',
+            dest="verify",
+            help="read the node settings back from the device, rather than showing the requested settings"
+        )
+
     parser.add_argument(
             "-w", "--waveform",
             choices=waveform_map,
@@ -202,6 +204,7 @@ def main():
             demo_analog_output_instrument_api(
                 device.analogOut,
                 args.continue_playing,
+                args.verify,
                 ch1_settings,
                 ch2_settings,
             )
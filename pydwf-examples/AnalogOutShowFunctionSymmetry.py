@@ -10,6 +10,7 @@ import argparse
 import numpy as np
 import matplotlib.pyplot as plt
 
+from plot_utilities import BlittedPlot
 from analog_output_node_utilities import (get_analog_output_node_settings, set_analog_output_node_settings,
                                           analog_output_signal_simulator)
 
@@ -19,7 +20,7 @@ from pydwf import (DwfLibrary, DwfDevice, DwfEnumConfigInfo, DwfAnalogOutNode, D
 from pydwf.utilities import openDwfDevice
 
 
-def analog_output_function_symmetry_demo(device: DwfDevice, num_periods: int) -> None:
+def analog_output_function_symmetry_demo(device: DwfDevice, num_periods: int, plot_every: int) -> None:
     """Demonstrate the effect of different 'symmetry' settings on the analog output functions."""
 
     # pylint: disable=too-many-locals, too-many-statements, too-many-branches
@@ -48,117 +49,171 @@ def analog_output_function_symmetry_demo(device: DwfDevice, num_periods: int) ->
 
     input_frequency_setpoint = 1e6 # 1 MHz
 
+    # The lines have as many points as the analog-in buffer has samples, i.e., many more than there are pixels.
+    # Let matplotlib simplify the line paths more aggressively (path.simplify is on by default), and render
+    # long paths in chunks.
+    plt.rcParams["path.simplify"] = True
+    plt.rcParams["path.simplify_threshold"] = 1.0
+    plt.rcParams["agg.path.chunksize"] = 10000
+
+    # Create the figure once. For each symmetry setting, only the lines and the figure title are updated.
+
+    (fig, axes) = plt.subplots(3, 3, figsize=(16, 9))
+    fig.subplots_adjust(hspace=0.4)
+
+    suptitle = fig.suptitle("")
+
+    predicted_lines = []
+    measured_lines = []
+
+    for (waveform_index, (waveform_func, ax)) in enumerate(zip(waveform_functions, axes.flat), 1):
+
+        ax.set_title(waveform_func.name)
+        ax.set_xlim(-0.1, num_periods + 0.1)
+        ax.set_ylim(-1.1, 1.1)
+
+        (predicted_line, ) = ax.plot([], [], lw=5.0, c='cyan', label="calculated")
+        (measured_line, ) = ax.plot([], [], c='blue', label="measured")
+
+        predicted_lines.append(predicted_line)
+        measured_lines.append(measured_line)
+
+        for period_boundary in range(1, num_periods):
+            ax.axvline(period_boundary, c='gray')
+
+        if waveform_index == 1:
+            ax.legend(loc="upper left")
+
+        if waveform_index == 8:
+            ax.set_xlabel("period")
+
+        if waveform_index == 4:
+            ax.set_ylabel("signal")
+
+    plt.show(block=False)
+
+    blitted_plot = BlittedPlot(fig, [suptitle] + predicted_lines + measured_lines)
+
+    # The symmetry sweep goes back and forth over the same settings, so the calculated signals are cached.
+    # The settings read back from the device, together with the sample times, fully determine the signal.
+    # Signals are stored in single precision, which is plenty for plotting, to halve the cache size.
+    predicted_samples_cache = {}
+
+    # The sample times and plot x values only depend on the analog-in buffer size and frequency.
+    sample_axes = {}
+
     symmetry_setpoint = 0
     stepsize = 5
 
-    while True:
+    step = 0
 
-        plt.clf()
+    while True:
 
-        plt.gcf().set_size_inches(16, 9)
-        plt.subplots_adjust(hspace=0.4)
+        # Only every plot_every-th symmetry setting is measured and shown; the settings in between are skipped,
+        # including their device acquisitions, so the sweep advances faster.
+        if step % plot_every == 0:
 
-        plt.suptitle("Effect of the symmetry setting on different wave-shape functions\nsymmetry parameter value = {}".
-                     format(symmetry_setpoint))
+            suptitle.set_text("Effect of the symmetry setting on different wave-shape functions\n"
+                              "symmetry parameter value = {}".format(symmetry_setpoint))
 
-        for (waveform_index, waveform_func) in enumerate(waveform_functions, 1):
+            for (waveform_index, waveform_func) in enumerate(waveform_functions):
 
-            # Prepare analog-out device
+                # Prepare analog-out device
 
-            analogOut.reset(-1)
+                analogOut.reset(-1)
 
-            set_analog_output_node_settings(analogOut, CH1, DwfAnalogOutNode.Carrier,
-                                            enable    = True,
-                                            func      = waveform_func,
-                                            frequency = input_frequency_setpoint / 16384 * num_periods,
-                                            amplitude = 1.0,
-                                            offset    = 0.0,
-                                            symmetry  = symmetry_setpoint,
-                                            phase     = 0.0)
+                set_analog_output_node_settings(analogOut, CH1, DwfAnalogOutNode.Carrier,
+                                                enable    = True,
+                                                func      = waveform_func,
+                                                frequency = input_frequency_setpoint / 16384 * num_periods,
+                                                amplitude = 1.0,
+                                                offset    = 0.0,
+                                                symmetry  = symmetry_setpoint,
+                                                phase     = 0.0)
 
-            carrier_settings = get_analog_output_node_settings(analogOut, CH1, DwfAnalogOutNode.Carrier)
+                carrier_settings = get_analog_output_node_settings(analogOut, CH1, DwfAnalogOutNode.Carrier)
 
-            analogOut.idleSet(CH1, DwfAnalogOutIdle.Initial)
+                analogOut.idleSet(CH1, DwfAnalogOutIdle.Initial)
 
-            analogOut.triggerSourceSet(CH1, DwfTriggerSource.PC)
+                analogOut.triggerSourceSet(CH1, DwfTriggerSource.PC)
 
-            analogOut.configure(CH1, True)
+                analogOut.configure(CH1, True)
 
-            # Prepare analog-in device
+                # Prepare analog-in device
 
-            analogIn.reset()
+                analogIn.reset()
 
-            analogIn.frequencySet(input_frequency_setpoint)
-            input_frequency = analogIn.frequencyGet()
+                analogIn.frequencySet(input_frequency_setpoint)
+                input_frequency = analogIn.frequencyGet()
 
-            input_buffer_size      = analogIn.bufferSizeGet()
-            input_capture_duration = input_buffer_size / input_frequency
+                input_buffer_size      = analogIn.bufferSizeGet()
+                input_capture_duration = input_buffer_size / input_frequency
 
-            analogIn.channelEnableSet(CH1, True)
-            analogIn.channelFilterSet(CH1, DwfAnalogInFilter.Average)
-            analogIn.channelRangeSet(CH1, 5.0)
+                analogIn.channelEnableSet(CH1, True)
+                analogIn.channelFilterSet(CH1, DwfAnalogInFilter.Average)
+                analogIn.channelRangeSet(CH1, 5.0)
 
-            analogIn.acquisitionModeSet(DwfAcquisitionMode.Single)
+                analogIn.acquisitionModeSet(DwfAcquisitionMode.Single)
 
-            analogIn.triggerSourceSet(DwfTriggerSource.PC)
+                analogIn.triggerSourceSet(DwfTriggerSource.PC)
 
-            analogIn.triggerPositionSet(0.5 * input_capture_duration)
+                analogIn.triggerPositionSet(0.5 * input_capture_duration)
 
-            analogIn.configure(False, True)
+                analogIn.configure(False, True)
 
-            # Start both
+                # Start both
 
-            while True:
-                status = analogIn.status(True)
-                if status == DwfState.Armed:
-                    break
+                while True:
+                    status = analogIn.status(True)
+                    if status == DwfState.Armed:
+                        break
 
-            device.triggerPC()
+                device.triggerPC()
 
-            # Monitor analogIn
+                # Monitor analogIn
 
-            while True:
-                status = analogIn.status(True)
-                if status == DwfState.Done:
-                    break
+                while True:
+                    status = analogIn.status(True)
+                    if status == DwfState.Done:
+                        break
 
-            input_samples = analogIn.statusData(CH1, input_buffer_size)
+                input_samples = analogIn.statusData(CH1, input_buffer_size)
 
-            t = np.arange(input_buffer_size) / input_frequency
-            predicted_samples = analog_output_signal_simulator(carrier_settings, None, None, t)
+                sample_axes_key = (input_buffer_size, input_frequency)
 
-            # The "x" value goes from 0 to just under num_periods.
-            x = np.arange(input_buffer_size) / input_buffer_size * num_periods
+                if sample_axes_key not in sample_axes:
+                    t = np.arange(input_buffer_size) / input_frequency
+                    # The "x" value goes from 0 to just under num_periods.
+                    x = np.arange(input_buffer_size) / input_buffer_size * num_periods
+                    sample_axes[sample_axes_key] = (t, x)
 
-            plt.subplot(3, 3, waveform_index)
-            plt.title(waveform_func.name)
-            plt.xlim(-0.1, num_periods + 0.1)
-            plt.ylim(-1.1, 1.1)
+                (t, x) = sample_axes[sample_axes_key]
 
-            plt.plot(x, predicted_samples, lw=5.0, c='cyan', label="calculated")
-            plt.plot(x, input_samples, c='blue', label="measured")
-            for period_boundary in range(1, num_periods):
-                plt.axvline(period_boundary, c='gray')
+                predicted_samples_key = (carrier_settings, sample_axes_key)
 
-            if waveform_index == 1:
-                plt.legend(loc="upper left")
+                predicted_samples = predicted_samples_cache.get(predicted_samples_key)
+                if predicted_samples is None:
+                    predicted_samples = analog_output_signal_simulator(carrier_settings, None, None, t)
+                    predicted_samples = predicted_samples.astype(np.float32)
+                    predicted_samples_cache[predicted_samples_key] = predicted_samples
 
-            if waveform_index == 8:
-                plt.xlabel("period")
+                predicted_lines[waveform_index].set_data(x, predicted_samples)
+                measured_lines[waveform_index].set_data(x, input_samples)
 
-            if waveform_index == 4:
-                plt.ylabel("signal")
+            analogIn.reset()
+            analogOut.reset(-1)
 
-        analogIn.reset()
-        analogOut.reset(-1)
+            blitted_plot.update()
 
-        plt.pause(0.200)
+            # Process GUI events while waiting.
+            fig.canvas.start_event_loop(0.200)
 
-        if len(plt.get_fignums()) == 0:
-            # User has closed the window, finish.
-            break
+            if blitted_plot.closed:
+                # User has closed the window, finish.
+                break
 
         # Proceed to next symmetry setting.
+        step += 1
         symmetry_setpoint += stepsize
         if abs(symmetry_setpoint) > 100:
             stepsize *= -1
@@ -172,6 +227,7 @@ def main() -> None:
         description="Demonstrate the effect of the AnalogOut instrument's symmetry setting.")
 
     DEFAULT_NUM_PERIODS = 3
+    DEFAULT_PLOT_EVERY = 1
 
     parser.add_argument(
             "-sn", "--serial-number-filter",
@@ -189,8 +245,20 @@ def main() -> None:
             help="number of periods of the function (default: {})".format(DEFAULT_NUM_PERIODS)
         )
 
+    parser.add_argument(
+            "-pe", "--plot-every",
+            type=int,
+            default=DEFAULT_PLOT_EVERY,
+            dest="plot_every",
+            help="measure and plot only every n-th symmetry setting; the device acquisitions of the settings in "
+                 "between are skipped too (default: {})".format(DEFAULT_PLOT_EVERY)
+        )
+
     args = parser.parse_args()
 
+    if args.plot_every < 1:
+        parser.error("the --plot-every value must be at least 1")
+
     def maximize_analog_in_buffer_size(configuration_parameters):
         """Select the configuration with the highest possible analog in buffer size."""
         return configuration_parameters[DwfEnumConfigInfo.AnalogInBufferSize]
@@ -199,7 +267,7 @@ def main() -> None:
         dwf = DwfLibrary()
         with openDwfDevice(dwf, serial_number_filter=args.serial_number_filter,
                            score_func=maximize_analog_in_buffer_size) as device:
-            analog_output_function_symmetry_demo(device, args.num_periods)
+            analog_output_function_symmetry_demo(device, args.num_periods, args.plot_every)
     except PyDwfError as exception:
         print("PyDwfError:", exception)
     except KeyboardInterrupt:
@@ -35,23 +35,31 @@ def demo_simple_analog_out(analogOut):
 
     frequency = 1.0  # Hz
 
+    # The loop below is limited by the time each amplitude setting takes to reach the device. Bind the method,
+    # the node, and the per-second phase increment to local names, to keep the Python overhead per loop minimal.
+    amplitude_set = analogOut.nodeAmplitudeSet
+    carrier = DwfAnalogOutNode.Carrier
+    omega = 2 * math.pi * frequency
+    cos = math.cos
+    sin = math.sin
+    monotonic = time.monotonic
+
     t_stopwatch = 0.0
     counter = 0
 
-    t0 = time.monotonic()
+    t0 = monotonic()
 
     while True:
 
-        t = time.monotonic() - t0
+        t = monotonic() - t0
 
-        vx = 2.5 * math.cos(2 * math.pi * t * frequency)
-        vy = 2.5 * math.sin(2 * math.pi * t * frequency)
+        angle = omega * t
 
         # To change the output signal on each of the two channels, we just need to change the channel's
         # amplitude setting.
 
-        analogOut.nodeAmplitudeSet(CH1, DwfAnalogOutNode.Carrier, vx)
-        analogOut.nodeAmplitudeSet(CH2, DwfAnalogOutNode.Carrier, vy)
+        amplitude_set(CH1, carrier, 2.5 * cos(angle))
+        amplitude_set(CH2, carrier, 2.5 * sin(angle))
 
         counter += 1
         if counter == 1000:
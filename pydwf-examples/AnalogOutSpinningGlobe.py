@@ -2,6 +2,7 @@
 
 """Spinning Globe example."""
 
+import math
 import time
 import threading
 import queue
@@ -22,10 +23,16 @@ def points_to_lines(points):
     return np.hstack((points[:, :1], np.repeat(points[:, 1:-1], 2, axis=1), points[:, -1:]))
 
 
-def polygon_to_lines_3d(polygon):
-    """Convert a single GSHHS polygon to a collection of 3D lines."""
-    theta = np.deg2rad(90.0 - polygon.points[:]["latitude" ] / 1e6)
-    phi   = np.deg2rad(       polygon.points[:]["longitude"] / 1e6)
+def polygons_to_lines_3d(polygons):
+    """Convert multiple GSHHS polygons to a collection of 3D lines.
+
+    The points of all polygons are converted to 3D in one go. The lines connect consecutive points of each
+    polygon, as points_to_lines() does for a single polygon.
+    """
+    points = np.concatenate([polygon.points for polygon in polygons])
+
+    theta = np.deg2rad(90.0 - points["latitude" ] / 1e6)
+    phi   = np.deg2rad(       points["longitude"] / 1e6)
 
     sin_theta = np.sin(theta)
 
@@ -35,15 +42,20 @@ def polygon_to_lines_3d(polygon):
 
     points = np.stack((x, y, z))
 
-    return points_to_lines(points)
+    # Each point starts a line to the next point, except for the last point of each polygon.
+    # A polygon with a single point is represented by a single zero-length line.
+    polygon_lengths = np.array([len(polygon.points) for polygon in polygons])
+    is_last_point = np.zeros(points.shape[1], dtype=bool)
+    is_last_point[np.cumsum(polygon_lengths)[polygon_lengths > 0] - 1] = True
+    is_single_point = np.repeat(polygon_lengths == 1, polygon_lengths)
 
+    line_start = np.flatnonzero(~is_last_point | is_single_point)
+    line_end = line_start + ~is_last_point[line_start]
 
-def polygons_to_lines_3d(polygons):
-    """Convert multiple GSHHS polygons to a collection of 3D lines."""
-    return np.hstack(tuple(polygon_to_lines_3d(polygon) for polygon in polygons))
+    return points[:, np.stack((line_start, line_end), axis=1).ravel()]
 
 
-def read_gshhs_globe(resolution, polygon_filter_func=None):
+def read_gshhs_globe(resolution, polygon_filter_func=None, polygon_mask_func=None):
     """Read GSHHS vector data and convert it to a collection of 3D lines."""
     assert 1 <= resolution <= 5
 
@@ -61,7 +73,7 @@ def read_gshhs_globe(resolution, polygon_filter_func=None):
     polygons = []
     for gshhs_filename in gshhs_filenames:
         print("Reading {!r} ...".format(gshhs_filename))
-        polygons.extend(read_gshhs_polygons(gshhs_filename, polygon_filter_func))
+        polygons.extend(read_gshhs_polygons(gshhs_filename, polygon_filter_func, polygon_mask_func))
 
     globe = polygons_to_lines_3d(polygons)
 
@@ -89,81 +101,181 @@ def rotation_matrix(alpha, rx, ry, rz):
 
     This replicates the standard 3D rotation matrix as used in OpenGL.
     """
-    ca = np.cos(alpha)
-    sa = np.sin(alpha)
+    ca = math.cos(alpha)
+    sa = math.sin(alpha)
+    t = 1.0 - ca
 
     # Normalize the rotation vector.
-    length = np.sqrt(rx*rx + ry*ry + rz*rz)
+    length = math.sqrt(rx*rx + ry*ry + rz*rz)
     nx = rx / length
     ny = ry / length
     nz = rz / length
 
-    m1 = (1 - ca) * np.array([
-        [ nx * nx , ny * nx , nz * nx ],
-        [ nx * ny , ny * ny , nz * ny ],
-        [ nx * nz , ny * nz , nz * nz ]
+    # This is the sum of (1 - ca) times the outer product of the rotation vector, sa times its cross product
+    # matrix, and ca times the identity matrix, written out element by element.
+    return np.array([
+        [ t * nx * nx + ca      , t * ny * nx - sa * nz , t * nz * nx + sa * ny ],
+        [ t * nx * ny + sa * nz , t * ny * ny + ca      , t * nz * ny - sa * nx ],
+        [ t * nx * nz - sa * ny , t * ny * nz + sa * nx , t * nz * nz + ca      ]
     ])
 
-    m2 = sa * np.array([
-        [  0 , -nz, +ny ],
-        [ +nz,   0, -nx ],
-        [ -ny, +nx,   0 ]
-    ])
 
-    m3 = ca * np.identity(3)
+class GlobeRenderer:
+    """Render frames of a globe as XY samples.
 
-    return m1 + m2 + m3
+    The renderer allocates its working buffers once, sized for the case where all globe lines are visible,
+    and reuses them for every frame.
 
+    The geometry (rotation, culling, line deltas) is calculated in the floating point type of the globe, which
+    may be single precision to halve memory traffic. The path positions and the samples themselves are always
+    calculated in double precision.
+    """
 
-def frame_producer(globe, circle_lines, samples_per_frame, revolutions_per_frame, event, frame_queue):
-    """This function produces frames of XY data for a spinning globe."""
+    # pylint: disable=too-few-public-methods, too-many-instance-attributes
 
-    # pylint: disable=too-many-locals
+    def __init__(self, globe, circle_lines, samples_per_frame: int):
+        self.globe = globe
 
-    frame = 0
-    while not event.is_set():
+        num_globe_points = globe.shape[1]
+        num_circle_points = circle_lines.shape[1]
+        num_points = num_circle_points + num_globe_points
 
-        t1 = time.perf_counter()
+        self.num_circle_points = num_circle_points
 
-        rotation_angle = revolutions_per_frame * frame * 2.0 * np.pi
+        dtype = globe.dtype
 
-        m = rotation_matrix(rotation_angle, 0, 1, 0)
+        self.depth = np.empty(num_globe_points, dtype=dtype)
+        self.visible_globe_lines = np.empty((3, num_globe_points // 2, 2), dtype=dtype)
+
+        # The circle lines are the same in every frame; the visible globe lines are placed after them.
+        self.lines_x = np.empty(num_points, dtype=dtype)
+        self.lines_y = np.empty(num_points, dtype=dtype)
+        self.lines_x[:num_circle_points] = circle_lines[0]
+        self.lines_y[:num_circle_points] = circle_lines[1]
+
+        self.lines_dx = np.empty(num_points // 2, dtype=dtype)
+        self.lines_dy = np.empty(num_points // 2, dtype=dtype)
+        self.lines_lengths = np.empty(num_points // 2)
+        self.lines_lengths_cumulative = np.empty(num_points // 2)
 
-        transformed_globe = m.dot(globe)
+        self.unit_ramp = np.linspace(0.0, 1.0, samples_per_frame)
+        self.ti = np.empty(samples_per_frame)
+        self.line_position = np.empty(samples_per_frame)
+        self.line_length = np.empty(samples_per_frame)
+        self.sample_temp = np.empty(samples_per_frame, dtype=dtype)
 
-        # Select only lines with z > 0 (so we don't see the back-side of the globe).
-        selection = (transformed_globe[2] >= 0)  # pylint: disable=superfluous-parens
-        selection = np.repeat(np.all(selection.reshape(-1, 2), axis=1), 2)
-        transformed_globe = transformed_globe[:, selection]
+    def render(self, m, xy):
+        """Render a single frame of the globe, rotated by matrix m, into the (2, samples_per_frame) array xy.
 
-        # Drop the z (depth) component
-        projected_globe = transformed_globe[0:2]
+        Returns the number of lines drawn and their total length.
+        """
 
-        lines_2d = np.hstack((circle_lines, projected_globe))
+        # Select only lines with z >= 0 (so we don't see the back-side of the globe). We only need the z (depth)
+        # component of the rotated globe for this. The x and y components are only calculated for the selected
+        # lines.
+        m = m.astype(self.globe.dtype, copy=False)
 
-        lines_2d_lengths = np.linalg.norm(lines_2d[:, 1::2] - lines_2d[:, 0::2], axis=0)
+        depth = np.dot(m[2], self.globe, out=self.depth)
+        line_selection = (depth[0::2] >= 0)
+        line_selection &= (depth[1::2] >= 0)
 
-        lines_2d_lengths_cumulative = np.cumsum(lines_2d_lengths)
+        # Copy the selected lines, i.e., pairs of points.
+        num_visible_lines = np.count_nonzero(line_selection)
+        visible_globe_lines = self.visible_globe_lines[:, :num_visible_lines]
+        np.compress(line_selection, self.globe.reshape(3, -1, 2), axis=1, out=visible_globe_lines)
 
-        total_lines2d_length = lines_2d_lengths_cumulative[-1]
+        num_visible_points = 2 * num_visible_lines
+        visible_globe = visible_globe_lines.reshape(3, num_visible_points)
 
-        interp_t = np.hstack((0.0, np.repeat(lines_2d_lengths_cumulative[:-1], 2), total_lines2d_length))
+        num_points = self.num_circle_points + num_visible_points
+        num_lines = num_points // 2
+
+        lines_x = self.lines_x[:num_points]
+        lines_y = self.lines_y[:num_points]
+
+        np.dot(m[0], visible_globe, out=lines_x[self.num_circle_points:])
+        np.dot(m[1], visible_globe, out=lines_y[self.num_circle_points:])
+
+        lines_dx = np.subtract(lines_x[1::2], lines_x[0::2], out=self.lines_dx[:num_lines])
+        lines_dy = np.subtract(lines_y[1::2], lines_y[0::2], out=self.lines_dy[:num_lines])
+
+        lines_lengths = np.hypot(lines_dx, lines_dy, out=self.lines_lengths[:num_lines])
+        lines_lengths_cumulative = np.cumsum(lines_lengths, out=self.lines_lengths_cumulative[:num_lines])
+
+        total_lines2d_length = lines_lengths_cumulative[-1]
 
         # We now have a list of 2D lines, with total length 'total_lines2d_length'.
         # Sample this as a path for the scope to follow to obtain all (x, y) samples for a full frame.
 
-        ti = np.linspace(0.0, total_lines2d_length, samples_per_frame)
-        xi = np.interp(ti, interp_t, lines_2d[0])
-        yi = np.interp(ti, interp_t, lines_2d[1])
+        ti = np.multiply(self.unit_ramp, total_lines2d_length, out=self.ti)
+
+        # Find the line that each sample is on. Line j covers path positions from
+        # (lines_lengths_cumulative[j] - lines_lengths[j]) up to lines_lengths_cumulative[j].
+        line_index = np.searchsorted(lines_lengths_cumulative, ti, side='right')
+        np.minimum(line_index, num_lines - 1, out=line_index)
+
+        # Determine the fractional position of each sample along its line. Zero-length lines are only ever
+        # selected for a sample at their start, where the fractional position is zero.
+        line_length = np.take(lines_lengths, line_index, out=self.line_length)
+        line_position = np.take(lines_lengths_cumulative, line_index, out=self.line_position)
+        np.subtract(line_position, line_length, out=line_position)
+        np.subtract(ti, line_position, out=line_position)
+        np.divide(line_position, line_length, out=line_position, where=(line_length != 0))
+
+        # Both coordinates are interpolated using the same line indices and positions.
+        sample_temp = self.sample_temp
+        for (lines_coordinate, lines_delta, samples) in ((lines_x, lines_dx, xy[0]), (lines_y, lines_dy, xy[1])):
+            np.take(lines_delta, line_index, out=sample_temp)
+            np.multiply(sample_temp, line_position, out=samples)
+            np.take(lines_coordinate[0::2], line_index, out=sample_temp)
+            samples += sample_temp
+
+        return (num_lines, total_lines2d_length)
+
+
+def frame_producer(globe, circle_lines, samples_per_frame, revolutions_per_frame, event, free_queue, full_queue):
+    """This function produces frames of XY data for a spinning globe.
+
+    Frames are rendered into buffers taken from the free_queue, and passed on via the full_queue.
+    """
+
+    # pylint: disable=too-many-arguments, too-many-locals
+
+    renderer = GlobeRenderer(globe, circle_lines, samples_per_frame)
+
+    # Bind the functions and methods called for every frame to local names. The NumPy calls that do the actual
+    # work are made on the renderer's preallocated buffers, in GlobeRenderer.render().
+    perf_counter = time.perf_counter
+    render = renderer.render
+    get_free_buffer = free_queue.get
+    put_frame = full_queue.put
+    is_set = event.is_set
+
+    radians_per_frame = revolutions_per_frame * 2.0 * math.pi
+
+    frame = 0
+    while not is_set():
+
+        # Wait for a free frame buffer, but keep an eye on the event.
+        try:
+            xy = get_free_buffer(timeout=0.1)
+        except queue.Empty:
+            continue
+
+        t1 = perf_counter()
+
+        rotation_angle = radians_per_frame * frame
+
+        m = rotation_matrix(rotation_angle, 0, 1, 0)
 
-        xy = np.stack((xi, yi))  # All samples in this frame.
+        (num_lines, total_lines2d_length) = render(m, xy)
 
-        t2 = time.perf_counter()
+        t2 = perf_counter()
 
         print("[{}] frame rendered: {} lines (length: {:8.3f}) in {:.6f} ms ({} samples)".format(
-            frame, len(lines_2d_lengths), total_lines2d_length, (t2 - t1) * 1000.0, samples_per_frame))
+            frame, num_lines, total_lines2d_length, (t2 - t1) * 1000.0, samples_per_frame))
 
-        frame_queue.put(xy)
+        put_frame(xy)
 
         frame += 1
 
@@ -190,23 +302,31 @@ def spinning_globe_demo(analogOut, resolution, sample_frequency, fps, revolution
         print("The device has no analog output channels that can be used for this demo.")
         return
 
-    # The frame_queue is used to pass frame samples from the frame_producer_thread to this thread.
-    frame_queue = queue.Queue(maxsize=5)
+    # Prepare data for the frame_producer thread.
+    samples_per_frame = round(sample_frequency / fps)
+    revolutions_per_frame = revolutions_per_sec / fps
+
+    # Frames are passed from the frame_producer_thread to this thread in a fixed pool of sample buffers, so no
+    # frame buffers are allocated while the demo runs. The producer renders into a buffer taken from the
+    # free_queue and puts it on the full_queue; this thread sends the samples to the instrument and returns
+    # the buffer to the free_queue. The buffers are double precision, as required by nodePlayData().
+    free_queue = queue.Queue()
+    full_queue = queue.Queue()
+    for _ in range(5):
+        free_queue.put(np.empty((2, samples_per_frame)))
 
     # The event is used to signal the desire to quit the program from the wait_for_input_thread
     # to the frame_producer_thread.
     event = threading.Event()
 
-    # Prepare data for the frame_producer thread.
-    samples_per_frame = round(sample_frequency / fps)
-    revolutions_per_frame = revolutions_per_sec / fps
-    globe = read_gshhs_globe(resolution)
-    circle_lines = make_circle_lines(360)
+    # The globe is stored in single precision; that is more than enough for the DAC resolution of the instrument.
+    globe = np.ascontiguousarray(read_gshhs_globe(resolution), dtype=np.float32)
+    circle_lines = make_circle_lines(360).astype(np.float32)
 
     # Create and start the frame_producer_thread.
     frame_producer_thread = threading.Thread(
         target=frame_producer,
-        args=(globe, circle_lines, samples_per_frame, revolutions_per_frame, event, frame_queue))
+        args=(globe, circle_lines, samples_per_frame, revolutions_per_frame, event, free_queue, full_queue))
     frame_producer_thread.start()
 
     # Create and start the wait_for_input_thread.
@@ -234,16 +354,25 @@ def spinning_globe_demo(analogOut, resolution, sample_frequency, fps, revolution
     # Configure CH2 to follow CH1.
     analogOut.masterSet(CH2, CH1)
 
+    # The play loop below only polls CH1; this is valid only if CH2 follows CH1.
+    assert analogOut.masterGet(CH2) == CH1
+
     analogOut.configure(CH1, True)  # Start channels 1 and 2.
 
     analogOut.device.triggerPC()
 
     # Analog-out loop.
 
-    while frame_producer_thread.is_alive() or not frame_queue.empty():
+    # Bind the methods used in the inner loop to local names.
+    status = analogOut.status
+    node_play_status = analogOut.nodePlayStatus
+    node_play_data = analogOut.nodePlayData
+    carrier = DwfAnalogOutNode.Carrier
+
+    while frame_producer_thread.is_alive() or not full_queue.empty():
 
         # Fetch XY data for the next frame.
-        xy = frame_queue.get()
+        xy = full_queue.get()
 
         # Push the XY data to the AnalogOut instrument.
 
@@ -254,33 +383,35 @@ def spinning_globe_demo(analogOut, resolution, sample_frequency, fps, revolution
 
             while True:
 
-                ch1_status = analogOut.status(CH1)
-                ch2_status = analogOut.status(CH2)
+                # CH2 follows CH1, and both channels receive the same number of samples, so the state and
+                # free buffer space of CH1 are representative for CH2 as well.
+                # The status() call refreshes the play status; it must not be part of the assertion.
+                state = status(CH1)
+                assert state == DwfState.Triggered
 
-                assert (ch1_status == DwfState.Triggered) and (ch2_status == DwfState.Triggered)
+                (transfer_possible, UNUSED_ch1_samples_lost, UNUSED_ch1_samples_corrupted) = \
+                    node_play_status(CH1, carrier)
 
-                (ch1_samples_free, UNUSED_ch1_samples_lost, UNUSED_ch1_samples_corrupted) = \
-                    analogOut.nodePlayStatus(CH1, DwfAnalogOutNode.Carrier)
+                transfer_needed = min(2048, samples_left)
 
-                (ch2_samples_free, UNUSED_ch2_samples_lost, UNUSED_ch2_samples_corrupted) = \
-                    analogOut.nodePlayStatus(CH2, DwfAnalogOutNode.Carrier)
-
-                transfer_possible = min(ch1_samples_free, ch2_samples_free)
-
-                if transfer_possible >= min(2048, samples_left):
+                if transfer_possible >= transfer_needed:
                     break
 
-                # Wait for buffer space to free up in the instrument.
-                time.sleep(0.001)
+                # Wait for buffer space to free up in the instrument. The instrument frees up buffer space at the
+                # sample frequency; sleep for half the time it needs to free up the space we need.
+                time.sleep(max(0.5 * (transfer_needed - transfer_possible) / sample_frequency, 50e-6))
 
             transfer_samples = min(transfer_possible, samples_left)
 
-            analogOut.nodePlayData(CH1, DwfAnalogOutNode.Carrier, xy[0, offset:offset + transfer_samples])
-            analogOut.nodePlayData(CH2, DwfAnalogOutNode.Carrier, xy[1, offset:offset + transfer_samples])
+            node_play_data(CH1, carrier, xy[0, offset:offset + transfer_samples])
+            node_play_data(CH2, carrier, xy[1, offset:offset + transfer_samples])
 
             offset += transfer_samples
             samples_left -= transfer_samples
 
+        # All samples of the frame have been sent to the instrument; the buffer can be reused.
+        free_queue.put(xy)
+
     # End of analog-out loop; join the threads.
 
     wait_for_input_thread.join()
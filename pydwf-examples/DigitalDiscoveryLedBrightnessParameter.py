@@ -19,11 +19,22 @@ from pydwf.utilities import openDwfDevice
 def demo_led_brightness_device_parameter(device, modulation_frequency):
     """Demonstrate usage of a device parameter to control the LED of a Digilent Discovery."""
     print("Modulating LED frequency at {} Hz. Press CTRL-C to quit.".format(modulation_frequency))
+
+    # The brightness only takes integer values between 0 and 100, so most loop iterations would set the
+    # same value as the previous one. Only send a new value to the device when it changes, and limit the
+    # loop rate to 200 Hz.
+    update_interval = 0.005
+
+    previous_brightness = None
+
     t0 = time.perf_counter()
     while True:
         t = time.perf_counter() - t0
         brightness = round(50 + 50 * math.sin(t * modulation_frequency * 2.0 * math.pi))
-        device.paramSet(DwfDeviceParameter.LedBrightness, brightness)
+        if brightness != previous_brightness:
+            device.paramSet(DwfDeviceParameter.LedBrightness, brightness)
+            previous_brightness = brightness
+        time.sleep(update_interval)
 
 
 def main():
@@ -10,6 +10,11 @@ from pydwf import DwfLibrary, PyDwfError
 from pydwf.utilities import openDwfDevice
 
 
+def format_bits(value: int, num_bits: int) -> str:
+    """Format a pin bitmask as a binary number, right-aligned to the width of a 64-bit bitmask."""
+    return (64 - num_bits) * " " + "0b" + bin(value)[2:].zfill(num_bits)
+
+
 def demo_digital_io_api(digitalIO) -> None:
     """Demonstrate the Digital I/O functionality."""
 
@@ -17,38 +22,38 @@ def demo_digital_io_api(digitalIO) -> None:
 
     print("Pins that support output-enable (i.e., tristate) functionality:")
     print()
-    print("  outputEnableInfo (32 bit) ...... : {}0b{:032b}".format(32 * " ", digitalIO.outputEnableInfo()))
-    print("  outputEnableInfo (64 bit) ...... : {}0b{:064b}".format( 0 * " ", digitalIO.outputEnableInfo64()))
+    print("  outputEnableInfo (32 bit) ...... : {}".format(format_bits(digitalIO.outputEnableInfo(), 32)))
+    print("  outputEnableInfo (64 bit) ...... : {}".format(format_bits(digitalIO.outputEnableInfo64(), 64)))
     print()
 
     print("Pins for which output-enable is active (i.e. are not tri-stated):")
     print()
-    print("  outputEnableGet (32 bit) ....... : {}0b{:032b}".format(32 * " ", digitalIO.outputEnableGet()))
-    print("  outputEnableGet (64 bit) ....... : {}0b{:064b}".format( 0 * " ", digitalIO.outputEnableGet64()))
+    print("  outputEnableGet (32 bit) ....... : {}".format(format_bits(digitalIO.outputEnableGet(), 32)))
+    print("  outputEnableGet (64 bit) ....... : {}".format(format_bits(digitalIO.outputEnableGet64(), 64)))
     print()
 
     print("Pins that are capable of driving output:")
     print()
-    print("  outputInfo (32 bit) ............ : {}0b{:032b}".format(32 * " ", digitalIO.outputInfo()))
-    print("  outputInfo (64 bit) ............ : {}0b{:064b}".format( 0 * " ", digitalIO.outputInfo64()))
+    print("  outputInfo (32 bit) ............ : {}".format(format_bits(digitalIO.outputInfo(), 32)))
+    print("  outputInfo (64 bit) ............ : {}".format(format_bits(digitalIO.outputInfo64(), 64)))
     print()
 
     print("Pins for which output is set to high:")
     print()
-    print("  outputGet (32 bit) ............. : {}0b{:032b}".format(32 * " ", digitalIO.outputGet()))
-    print("  outputGet (64 bit) ............. : {}0b{:064b}".format( 0 * " ", digitalIO.outputGet64()))
+    print("  outputGet (32 bit) ............. : {}".format(format_bits(digitalIO.outputGet(), 32)))
+    print("  outputGet (64 bit) ............. : {}".format(format_bits(digitalIO.outputGet64(), 64)))
     print()
 
     print("Pins that can be used as input:")
     print()
-    print("  inputInfo (32 bit) ............. : {}0b{:032b}".format(32 * " ", digitalIO.inputInfo()))
-    print("  inputInfo (64 bit) ............. : {}0b{:064b}".format( 0 * " ", digitalIO.inputInfo64()))
+    print("  inputInfo (32 bit) ............. : {}".format(format_bits(digitalIO.inputInfo(), 32)))
+    print("  inputInfo (64 bit) ............. : {}".format(format_bits(digitalIO.inputInfo64(), 64)))
     print()
 
     print("Pin input status:")
     print()
-    print("  inputStatus (32 bit) ........... : {}0b{:032b}".format(32 * " ", digitalIO.inputStatus()))
-    print("  inputStatus (64 bit) ........... : {}0b{:064b}".format( 0 * " ", digitalIO.inputStatus64()))
+    print("  inputStatus (32 bit) ........... : {}".format(format_bits(digitalIO.inputStatus(), 32)))
+    print("  inputStatus (64 bit) ........... : {}".format(format_bits(digitalIO.inputStatus64(), 64)))
     print()
 
     save_output_bits = digitalIO.outputEnableGet64()
@@ -60,8 +65,8 @@ def demo_digital_io_api(digitalIO) -> None:
         for rep in range(100):  # pylint: disable=unused-variable
             random_bits = random.randrange(0, 2 ** 64) & all_bits
             digitalIO.outputSet64(random_bits)
-            print("  outputGet (64 bit) ............. : {}0b{:064b}".format( 0 * " ", digitalIO.outputGet64()))
-            print("  inputStatus (64 bit) ........... : {}0b{:064b}".format( 0 * " ", digitalIO.inputStatus64()))
+            print("  outputGet (64 bit) ............. : {}".format(format_bits(digitalIO.outputGet64(), 64)))
+            print("  inputStatus (64 bit) ........... : {}".format(format_bits(digitalIO.inputStatus64(), 64)))
             print()
             time.sleep(0.500)
     finally:
@@ -5,8 +5,10 @@
 Show the behavior of status, run_status, and repeat_status before, during, and after Pulse-mode playback is active.
 """
 
-from typing import Optional, Tuple
+from typing import Optional, Tuple, List
 import argparse
+import functools
+import itertools
 import time
 
 import numpy as np
@@ -20,41 +22,25 @@ from pydwf.utilities import openDwfDevice
 
 def summarize(sequence, separator: str = " followed by ") -> str:
     """Summarize a sequence of values as a string."""
-    strings = []
-
-    current = None
-    current_count = 0
-
-    for e in sequence:
-        if current_count == 0:
-            current = e
-            current_count = 1
-        elif e == current:
-            current_count += 1
-        else:
-            strings.append("{} × {}".format(current_count, current))
-            current_count = 1
-            current = e
-
-    if current_count != 0:
-        strings.append("{} × {}".format(current_count, current))
-
+    strings = ["{} × {}".format(sum(1 for _ in group), value) for (value, group) in itertools.groupby(sequence)]
     return separator.join(strings) if strings else "(none)"
 
 
-def get_channel_values(digitalOut, func) -> Tuple:
-    """Get the result of applying 'func' to all DigitalOut channels."""
-    return tuple(func(channel_index) for channel_index in range(digitalOut.count()))
+def get_channel_values(func, channel_indices) -> List:
+    """Get the result of applying 'func' to the given DigitalOut channels."""
+    return [func(channel_index) for channel_index in channel_indices]
+
 
+@functools.lru_cache(maxsize=256)
+def enum_values_to_str(values: Tuple) -> str:
+    """Summarize a tuple of enumeration values as a string.
 
-def enum_values_to_str(values):
-    """Summarize a collection of enumeration values as a string."""
-    enum_type_name = None
-    for value in values:
-        if enum_type_name is None:
-            enum_type_name = value.__class__.__name__
-        elif enum_type_name != value.__class__.__name__:
-            raise RuntimeError("Enum values are of different types.")
+    Most channels report the same values, so the results are cached.
+    """
+    enum_type_names = {value.__class__.__name__ for value in values}
+    if len(enum_type_names) > 1:
+        raise RuntimeError("Enum values are of different types.")
+    enum_type_name = enum_type_names.pop() if enum_type_names else None
     return "{}.{{{}}}".format(enum_type_name, "|".join(value.name for value in values))
 
 
@@ -67,11 +53,12 @@ def print_digital_output_info(digitalOut):
     # pylint: disable=line-too-long, unnecessary-lambda
 
     channel_count = digitalOut.count()
+    channel_indices = range(channel_count)
 
     print("=== digitalOut global info:")
     print()
     print("    digitalOut.internalClockInfo() ...... : {:10} [Hz]".format(digitalOut.internalClockInfo()))
-    print("    digitalOut.triggerSourceInfo() ...... : {}".format(enum_values_to_str(digitalOut.triggerSourceInfo())))
+    print("    digitalOut.triggerSourceInfo() ...... : {}".format(enum_values_to_str(tuple(digitalOut.triggerSourceInfo()))))
     print("    digitalOut.runInfo() ................ : {} [s]".format(digitalOut.runInfo()))
     print("    digitalOut.waitInfo() ............... : {} [s]".format(digitalOut.waitInfo()))
     print("    digitalOut.repeatInfo() ............. : {} [-]".format(digitalOut.repeatInfo()))
@@ -80,12 +67,12 @@ def print_digital_output_info(digitalOut):
     print()
     print("=== digitalOut per-channel info --- channel index in range {} .. {} (channel count = {}):".format(0, channel_count - 1, channel_count))
     print()
-    print("    digitalOut.outputInfo(idx) .......... : {}".format(summarize(get_channel_values(digitalOut, lambda channel_index: enum_values_to_str(digitalOut.outputInfo(channel_index))))))
-    print("    digitalOut.typeInfo(idx) ............ : {}".format(summarize(get_channel_values(digitalOut, lambda channel_index: enum_values_to_str(digitalOut.typeInfo(channel_index))))))
-    print("    digitalOut.idleInfo(idx) ............ : {}".format(summarize(get_channel_values(digitalOut, lambda channel_index: enum_values_to_str(digitalOut.idleInfo(channel_index))))))
-    print("    digitalOut.dividerInfo(idx) ......... : {}".format(summarize(get_channel_values(digitalOut, lambda channel_index: digitalOut.dividerInfo(channel_index)))))
-    print("    digitalOut.counterInfo(idx) ......... : {}".format(summarize(get_channel_values(digitalOut, lambda channel_index: digitalOut.counterInfo(channel_index)))))
-    print("    digitalOut.dataInfo(idx) ............ : {}".format(summarize(get_channel_values(digitalOut, lambda channel_index: digitalOut.dataInfo(channel_index)))))
+    print("    digitalOut.outputInfo(idx) .......... : {}".format(summarize(get_channel_values(lambda channel_index: enum_values_to_str(tuple(digitalOut.outputInfo(channel_index))), channel_indices))))
+    print("    digitalOut.typeInfo(idx) ............ : {}".format(summarize(get_channel_values(lambda channel_index: enum_values_to_str(tuple(digitalOut.typeInfo(channel_index))), channel_indices))))
+    print("    digitalOut.idleInfo(idx) ............ : {}".format(summarize(get_channel_values(lambda channel_index: enum_values_to_str(tuple(digitalOut.idleInfo(channel_index))), channel_indices))))
+    print("    digitalOut.dividerInfo(idx) ......... : {}".format(summarize(get_channel_values(lambda channel_index: digitalOut.dividerInfo(channel_index), channel_indices))))
+    print("    digitalOut.counterInfo(idx) ......... : {}".format(summarize(get_channel_values(lambda channel_index: digitalOut.counterInfo(channel_index), channel_indices))))
+    print("    digitalOut.dataInfo(idx) ............ : {}".format(summarize(get_channel_values(lambda channel_index: digitalOut.dataInfo(channel_index), channel_indices))))
     print()
 
 
@@ -100,6 +87,7 @@ def print_digital_output_settings(digitalOut):
     # pylint: disable=line-too-long, unnecessary-lambda
 
     channel_count = digitalOut.count()
+    channel_indices = range(channel_count)
 
     print("=== digitalOut global current settings:")
     print()
@@ -112,14 +100,14 @@ def print_digital_output_settings(digitalOut):
     print()
     print("=== digitalOut per-channel current settings --- channel index in range {} .. {} (channel count = {}):".format(0, channel_count - 1, channel_count))
     print()
-    print("    digitalOut.enableGet(idx) ........... : {}".format(summarize(get_channel_values(digitalOut, lambda channel_index: digitalOut.enableGet(channel_index)))))
-    print("    digitalOut.outputGet(idx) ........... : {}".format(summarize(get_channel_values(digitalOut, lambda channel_index: digitalOut.outputGet(channel_index)))))
-    print("    digitalOut.typeGet(idx) ............. : {}".format(summarize(get_channel_values(digitalOut, lambda channel_index: digitalOut.typeGet(channel_index)))))
-    print("    digitalOut.idleGet(idx) ............. : {}".format(summarize(get_channel_values(digitalOut, lambda channel_index: digitalOut.idleGet(channel_index)))))
-    print("    digitalOut.dividerInitGet(idx) ...... : {}".format(summarize(get_channel_values(digitalOut, lambda channel_index: digitalOut.dividerInitGet(channel_index)))))
-    print("    digitalOut.dividerGet(idx) .......... : {}".format(summarize(get_channel_values(digitalOut, lambda channel_index: digitalOut.dividerGet(channel_index)))))
-    print("    digitalOut.counterInitGet(idx) ...... : {}".format(summarize(get_channel_values(digitalOut, lambda channel_index: digitalOut.counterInitGet(channel_index)))))
-    print("    digitalOut.counterGet(idx) .......... : {}".format(summarize(get_channel_values(digitalOut, lambda channel_index: digitalOut.counterGet(channel_index)))))
+    print("    digitalOut.enableGet(idx) ........... : {}".format(summarize(get_channel_values(lambda channel_index: digitalOut.enableGet(channel_index), channel_indices))))
+    print("    digitalOut.outputGet(idx) ........... : {}".format(summarize(get_channel_values(lambda channel_index: digitalOut.outputGet(channel_index), channel_indices))))
+    print("    digitalOut.typeGet(idx) ............. : {}".format(summarize(get_channel_values(lambda channel_index: digitalOut.typeGet(channel_index), channel_indices))))
+    print("    digitalOut.idleGet(idx) ............. : {}".format(summarize(get_channel_values(lambda channel_index: digitalOut.idleGet(channel_index), channel_indices))))
+    print("    digitalOut.dividerInitGet(idx) ...... : {}".format(summarize(get_channel_values(lambda channel_index: digitalOut.dividerInitGet(channel_index), channel_indices))))
+    print("    digitalOut.dividerGet(idx) .......... : {}".format(summarize(get_channel_values(lambda channel_index: digitalOut.dividerGet(channel_index), channel_indices))))
+    print("    digitalOut.counterInitGet(idx) ...... : {}".format(summarize(get_channel_values(lambda channel_index: digitalOut.counterInitGet(channel_index), channel_indices))))
+    print("    digitalOut.counterGet(idx) .......... : {}".format(summarize(get_channel_values(lambda channel_index: digitalOut.counterGet(channel_index), channel_indices))))
     print()
 
 
@@ -213,6 +201,9 @@ def demo_digital_out_instrument_api(digitalOut):
 
     digitalOut.reset()
 
+    # The internal clock frequency is static; query it once.
+    clock_frequency = digitalOut.internalClockInfo()
+
     print("===========================================")
     print("===                                     ===")
     print("===  DigitalOut instrument static info  ===")
@@ -231,11 +222,15 @@ def demo_digital_out_instrument_api(digitalOut):
 
     print_digital_output_settings(digitalOut)
 
+    run_duration  = 0.800
+    wait_duration = 0.200
+    repeat_count  = 4
+
     change_digital_output_global_settings(
             digitalOut,
-            run_duration        = 0.800,
-            wait_duration       = 0.200,
-            repeat_count        = 4,
+            run_duration        = run_duration,
+            wait_duration       = wait_duration,
+            repeat_count        = repeat_count,
             repeat_trigger_flag = False,
             trigger_source      = DwfTriggerSource.PC,
             trigger_slope       = DwfTriggerSlope.Rise
@@ -288,75 +283,124 @@ def demo_digital_out_instrument_api(digitalOut):
     t_slack = 0.500  # slack before trigger and after DwfState.Done
     t_max = 20.0
 
+    # The poll loop keeps time in integer nanoseconds, relative to t0; times are converted to seconds afterwards.
+    t_slack_ns = round(t_slack * 1e9)
+    t_max_ns = round(t_max * 1e9)
+
     trigger_asserted = False
-    t_done_seen      = None
+    t_done_seen_ns   = None
+
+    # The status is polled on a fixed grid of points in time, relative to t0.
+    poll_interval_ns = 5000000
+    t_next_poll_ns = poll_interval_ns
+
+    # The status samples are stored directly in preallocated arrays, one per quantity, so that each can be
+    # plotted from contiguous memory. The loop polls at most once per poll_interval_ns until t_max_ns, so this
+    # size suffices; the arrays are enlarged anyway if they do fill up.
+    max_status_samples = t_max_ns // poll_interval_ns + 64
+
+    st_t_ns       = np.empty(max_status_samples, dtype=np.int64)
+    st_status     = np.empty(max_status_samples, dtype=np.int32)
+    st_run_status = np.empty(max_status_samples)
+    st_rep_status = np.empty(max_status_samples, dtype=np.int32)
+
+    num_status_samples = 0
+
+    # Format of the status line printed for every poll; %-formatting is cheaper than str.format() here.
+    status_line_format = "[%20.9f] %-20s %30d %30d"
+
+    # Bind the methods and values used in the poll loop to local names.
+    get_status = digitalOut.status
+    get_run_status = digitalOut.runStatus
+    get_repeat_status = digitalOut.repeatStatus
+    perf_counter_ns = time.perf_counter_ns
+    sleep = time.sleep
+    state_done = DwfState.Done
 
     # Start the device.
     digitalOut.configure(True)
-    t0 = time.perf_counter()
+    t0_ns = perf_counter_ns()
 
-    status_list = []
     while True:
-        # The 'status' call is needed to update the runStatus() and repeatStatus() values.
-        status = digitalOut.status()
-        t = time.perf_counter() - t0
+        # The 'status' call is needed to update the runStatus() and repeatStatus() values. Those two calls return
+        # values from the status information fetched by status(), so each iteration does a single device round trip.
+        status = get_status()
+        t_ns = perf_counter_ns() - t0_ns
 
         if not trigger_asserted:
-            if t >= t_slack:
+            if t_ns >= t_slack_ns:
                 digitalOut.device.triggerPC()
                 trigger_asserted = True
-                actual_trigger_time = t
+                actual_trigger_time_ns = t_ns
 
-        run_status = digitalOut.runStatus()
-        repeat_status = digitalOut.repeatStatus()
+        run_status = get_run_status()
+        repeat_status = get_repeat_status()
 
+        # Both values are integers. A repeat_status of 65535 means -1, and run_status is a signed 48-bit value.
         if repeat_status == 65535:
             repeat_status = -1
 
-        repeat_status = round(repeat_status)
+        if run_status >= 0x800000000000:
+            run_status -= 0x1000000000000
+
+        print(status_line_format % (t_ns * 1e-9, status.name, run_status, repeat_status))
 
-        if run_status >= (2**47):
-            run_status -= (2**48)
+        if num_status_samples == len(st_t_ns):
+            (st_t_ns, st_status, st_run_status, st_rep_status) = (np.resize(st_array, 2 * len(st_array))
+                for st_array in (st_t_ns, st_status, st_run_status, st_rep_status))
 
-        print("[{:20.9f}] {:20} {:30} {:30}".format(t, status.name, run_status, repeat_status))
+        st_t_ns      [num_status_samples] = t_ns
+        st_status    [num_status_samples] = status.value
+        st_run_status[num_status_samples] = run_status
+        st_rep_status[num_status_samples] = repeat_status
 
-        status_list.append((t, status.value, run_status, repeat_status))
+        num_status_samples += 1
 
-        if t_done_seen is None:
-            if status == DwfState.Done:
-                t_done_seen = t
-                t_max = min(t_max, t + t_slack)
+        if t_done_seen_ns is None:
+            if status is state_done:
+                t_done_seen_ns = t_ns
+                t_max_ns = min(t_max_ns, t_ns + t_slack_ns)
 
-        if t > t_max:
+        if t_ns > t_max_ns:
             break
 
-        time.sleep(-time.time() % 0.005)
+        # Sleep until the next point of the polling grid. Grid points that have already passed are skipped.
+        t_ns = perf_counter_ns() - t0_ns
+        while t_next_poll_ns <= t_ns:
+            t_next_poll_ns += poll_interval_ns
+        sleep((t_next_poll_ns - t_ns) * 1e-9)
+        t_next_poll_ns += poll_interval_ns
+
+    actual_duration = (perf_counter_ns() - t0_ns) * 1e-9
 
-    actual_duration = time.perf_counter() - t0
+    t_max = t_max_ns * 1e-9
 
-    expected_duration = (digitalOut.runGet(), digitalOut.waitGet(), digitalOut.repeatGet())
+    # The settings are known; there is no need to read them back from the device.
+    expected_duration = (run_duration, wait_duration, repeat_count)
 
     print()
     print("Sequence done. Total duration: {:.9} [s] (expected: {} [s])".format(actual_duration, expected_duration))
 
-    status_array_dtype = np.dtype([
-            ('t', np.float64),
-            ('status', np.int32),
-            ('run_status', np.float64),
-            ('rep_status', np.int32)
-        ])
+    # Convert the sample times to seconds, relative to the trigger.
+    st_t = (st_t_ns[:num_status_samples] - actual_trigger_time_ns) * 1e-9
 
-    st = np.array(status_list, dtype=status_array_dtype)
+    st_status     = st_status    [:num_status_samples]
+    st_run_status = st_run_status[:num_status_samples]
+    st_rep_status = st_rep_status[:num_status_samples]
 
-    st["t"] -= actual_trigger_time
-    if t_done_seen is not None:
-        t_done_seen -= actual_trigger_time
+    if t_done_seen_ns is None:
+        t_done_seen = None
+    else:
+        t_done_seen = (t_done_seen_ns - actual_trigger_time_ns) * 1e-9
 
-    run_status_valid = (st["run_status"] >= 0)  # pylint: disable=superfluous-parens
+    run_status_valid = (st_run_status >= 0)  # pylint: disable=superfluous-parens
 
-    print("Invalid run_status values:", np.unique(st["run_status"][~run_status_valid]))
+    # Determine the invalid entries once; they are both reported and replaced by NaN.
+    run_status_invalid = np.flatnonzero(~run_status_valid)
 
-    st["run_status"][~run_status_valid] = np.nan
+    print("Invalid run_status values:", np.unique(st_run_status[run_status_invalid]))
+
+    st_run_status[run_status_invalid] = np.nan
 
     scatter_size = 4.0
 
@@ -365,39 +409,29 @@ def demo_digital_out_instrument_api(digitalOut):
 
     plt.suptitle("DigitalOut status behavior before and during Pulse playback")
 
-    plt.subplot(411)
-    plt.grid()
-    plt.axvline(0.0, c='red')
-    if t_done_seen is not None:
-        plt.axvline(t_done_seen, c='red')
-    plt.scatter(st["t"], st["status"], s=scatter_size)
-    plt.xlim(-t_slack, t_max)
-    plt.ylabel("status [DwfState]")
-
-    plt.subplot(412)
-    plt.axvline(0.0, c='red')
-    if t_done_seen is not None:
-        plt.axvline(t_done_seen, c='red')
-    plt.scatter(st["t"], run_status_valid, s=scatter_size)
-    plt.xlim(-t_slack, t_max)
-    plt.ylabel("run_status_valid")
-
-    plt.subplot(413)
-    plt.axvline(0.0, c='red')
-    if t_done_seen is not None:
-        plt.axvline(t_done_seen, c='red')
-    plt.scatter(st["t"], st["run_status"] / digitalOut.internalClockInfo(), s=scatter_size)
-    plt.xlim(-t_slack, t_max)
-    plt.ylabel("run_status [s]")
-
-    plt.subplot(414)
-    plt.axvline(0.0, c='red')
-    if t_done_seen is not None:
-        plt.axvline(t_done_seen, c='red')
-    plt.scatter(st["t"], st["rep_status"], s=scatter_size)
-    plt.xlim(-t_slack, t_max)
+    # Convert the run_status from clock cycles to seconds, multiplying by the clock period.
+    st_run_status_seconds = np.multiply(st_run_status, 1.0 / clock_frequency)
+
+    # All subplots share the time axis and the red markers for the trigger and the end of playback.
+    t_markers = [0.0] if t_done_seen is None else [0.0, t_done_seen]
+
+    subplot_data = (
+        ("status [DwfState]", st_status),
+        ("run_status_valid", run_status_valid),
+        ("run_status [s]", st_run_status_seconds),
+        ("rep_status", st_rep_status)
+    )
+
+    for (subplot_index, (ylabel, y)) in enumerate(subplot_data):
+        ax = plt.subplot(len(subplot_data), 1, subplot_index + 1)
+        ax.grid()
+        for t_marker in t_markers:
+            ax.axvline(t_marker, c='red')
+        ax.scatter(st_t, y, s=scatter_size)
+        ax.set_xlim(-t_slack, t_max)
+        ax.set_ylabel(ylabel)
+
     plt.xlabel("time [s]")
-    plt.ylabel("rep_status")
 
     plt.show()
 
@@ -33,7 +33,7 @@ def demo_can_protocol_api(can) -> None:
     # Loop until interrupted: repeatedly send and receive messages.
     i = 0
     while True:
-        message = "CAN_{:04x}".format(i).encode()
+        message = b"CAN_%04x" % i
         can.tx(17, 0, 0, message)
         (v_id, extended, remote, data, status) = can.rx(8)
         print("Received message {} ; vID = {}, extended = {}, remote = {}, status = {}".format(
@@ -15,10 +15,15 @@ To run this demo program, hook up an ADXL345 to the Analog Discovery as follows:
 
 import time
 import argparse
+import struct
+import sys
 
 from pydwf import DwfLibrary, PyDwfError
 from pydwf.utilities import openDwfDevice
 
+# The ADXL345 axis data registers hold three little-endian, signed 16-bit values (x, y, z).
+ADXL345_AXIS_DATA = struct.Struct("<3h")
+
 
 def set_positive_supply_voltage(analogIO, voltage: float):
     """Configure power supply."""
@@ -77,6 +82,10 @@ def demo_i2c_protocol_api(i2c, use_alt_address: bool):
     # Enable measurements (set 'Measure' bit in POWER_CTL register).
     i2c.write(I2C_CMD_WRITE, [0x2d, 0x08])
 
+    # Flushing the terminal output for every sample takes a system call each time; flush every 20 samples.
+    flush_interval = 20
+    sample_count = 0
+
     # Loop until interrupted.
     while True:
 
@@ -84,11 +93,13 @@ def demo_i2c_protocol_api(i2c, use_alt_address: bool):
         response = i2c.writeRead(I2C_CMD_READ, [0x32], 6)
         axis_data = response[1]
 
-        ax = (axis_data[0] + axis_data[1] * 256 + 32768) % 65536 - 32768
-        ay = (axis_data[2] + axis_data[3] * 256 + 32768) % 65536 - 32768
-        az = (axis_data[4] + axis_data[5] * 256 + 32768) % 65536 - 32768
+        (ax, ay, az) = ADXL345_AXIS_DATA.unpack(bytes(axis_data))
+
+        sys.stdout.write("\r[I2C] ADXL345: ax {:6} ay {:6} az {:6}".format(ax, ay, az))
 
-        print("\r[I2C] ADXL345: ax {:6} ay {:6} az {:6}".format(ax, ay, az), end="", flush=True)
+        sample_count += 1
+        if sample_count % flush_interval == 0:
+            sys.stdout.flush()
 
 
 def main():
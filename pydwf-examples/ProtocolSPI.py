@@ -15,10 +15,15 @@ To run this demo program, hook up an ADXL345 to the Analog Discovery as follows:
 
 import time
 import argparse
+import struct
+import sys
 
 from pydwf import DwfLibrary, DwfDigitalOutIdle, PyDwfError
 from pydwf.utilities import openDwfDevice
 
+# The ADXL345 axis data registers hold three little-endian, signed 16-bit values (x, y, z).
+ADXL345_AXIS_DATA = struct.Struct("<3h")
+
 
 def set_positive_supply_voltage(analogIO, voltage: float):
     """Configure power supply."""
@@ -77,6 +82,10 @@ def demo_spi_protocol_api(spi):
     response = spi.writeRead(SPI_TRANSFER_TYPE_MOSI_MISO, SPI_BITS_PER_WORD, [0x00 | 0x2d, 8])
     spi.select(SPI_CSn_PIN, SPI_CSn_STOP)    # Set chip-select to 1
 
+    # Flushing the terminal output for every sample takes a system call each time; flush every 20 samples.
+    flush_interval = 20
+    sample_count = 0
+
     # Loop until interrupted.
     while True:
 
@@ -88,11 +97,13 @@ def demo_spi_protocol_api(spi):
 
         axis_data = response[1:7]
 
-        ax = (axis_data[0] + axis_data[1] * 256 + 32768) % 65536 - 32768
-        ay = (axis_data[2] + axis_data[3] * 256 + 32768) % 65536 - 32768
-        az = (axis_data[4] + axis_data[5] * 256 + 32768) % 65536 - 32768
+        (ax, ay, az) = ADXL345_AXIS_DATA.unpack(bytes(axis_data))
+
+        sys.stdout.write("\r[SPI] ADXL345: ax {:6} ay {:6} az {:6}".format(ax, ay, az))
 
-        print("\r[SPI] ADXL345: ax {:6} ay {:6} az {:6}".format(ax, ay, az), end="", flush=True)
+        sample_count += 1
+        if sample_count % flush_interval == 0:
+            sys.stdout.flush()
 
 
 def main():
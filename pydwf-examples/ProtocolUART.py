@@ -32,7 +32,7 @@ def demo_uart_protocol_api(uart):
     # Loop until interrupted: repeatedly send and receive messages.
     i = 0
     while True:
-        message = "UART message #{}".format(i).encode()
+        message = b"UART message #%d" % i
         uart.tx(message)
         (rx_buffer, parity_status) = uart.rx(100)
         print("Received message {} with parity status {}".format(rx_buffer, parity_status))
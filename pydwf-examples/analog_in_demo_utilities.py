@@ -0,0 +1,68 @@
+"""Convenience functions and classes shared by the AnalogIn instrument demos."""
+
+import numpy as np
+
+from pydwf import DwfAnalogOutNode, DwfAnalogOutFunction
+
+
+def apply_setters(setter_calls):
+    """Apply a sequence of (setter, arguments) pairs in a single tight loop."""
+    for (setter, args) in setter_calls:
+        setter(*args)
+
+
+def configure_analog_output(analogOut, analog_out_frequency, analog_out_amplitude, analog_out_offset):
+    """Configure a cosine signal on channel 1, and a sine signal on channel 2."""
+
+    CH1 = 0  # This channel will carry a 'cosine' (i.e., precede channel 2 by 90 degrees).
+    CH2 = 1  # This channel will carry a 'sine'.
+
+    node = DwfAnalogOutNode.Carrier
+
+    analogOut.reset(-1)  # Reset both channels.
+
+    apply_setters([
+        (analogOut.nodeEnableSet   , (CH1, node, True)),
+        (analogOut.nodeFunctionSet , (CH1, node, DwfAnalogOutFunction.Sine)),
+        (analogOut.nodeFrequencySet, (CH1, node, analog_out_frequency)),
+        (analogOut.nodeAmplitudeSet, (CH1, node, analog_out_amplitude)),
+        (analogOut.nodeOffsetSet   , (CH1, node, analog_out_offset)),
+        (analogOut.nodePhaseSet    , (CH1, node, 90.0)),
+
+        (analogOut.nodeEnableSet   , (CH2, node, True)),
+        (analogOut.nodeFunctionSet , (CH2, node, DwfAnalogOutFunction.Sine)),
+        (analogOut.nodeFrequencySet, (CH2, node, analog_out_frequency)),
+        (analogOut.nodeAmplitudeSet, (CH2, node, analog_out_amplitude)),
+        (analogOut.nodeOffsetSet   , (CH2, node, analog_out_offset)),
+        (analogOut.nodePhaseSet    , (CH2, node, 0.0)),
+
+        # Synchronize second channel to first channel. This ensures that they will start simultaneously.
+        (analogOut.masterSet, (CH2, CH1))
+    ])
+
+    # Start output on first (and second) channel.
+    analogOut.configure(CH1, True)
+
+
+def decimate_minmax(x, y, bins: int):
+    """Reduce a signal to the minimum and maximum value in each of the given number of bins.
+
+    When plotting a signal with many more samples than there are horizontal pixels, most samples are not visible.
+    Keeping only the minimum and maximum per pixel column gives the same picture with far less rendering work.
+    Trailing samples that do not fill a complete bin are dropped.
+    """
+
+    bin_size = len(y) // bins
+
+    if bin_size < 2:
+        # Not enough samples to reduce.
+        return (x, y)
+
+    used_samples = bins * bin_size
+
+    y_bins = y[:used_samples].reshape(bins, bin_size)
+
+    y_decimated = np.stack((y_bins.min(axis=1), y_bins.max(axis=1)), axis=1).ravel()
+    x_decimated = np.repeat(x[:used_samples:bin_size], 2)
+
+    return (x_decimated, y_decimated)
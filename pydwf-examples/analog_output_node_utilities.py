@@ -64,107 +64,161 @@ def set_analog_output_node_settings(analogOut, channel_index: int, node: DwfAnal
         analogOut.nodePhaseSet(channel_index, node, phase)
 
 
-def _waveform_triangle(symmetry: float, x):
-    x = np.mod(x, 1.0)
-    q = np.clip(0.5 * (symmetry / 100.0), 0.000000001, 0.4999999999)
-    y = ((2 * q - 1) * (2 * x - 1) + np.abs(q - x) - np.abs(q + x - 1)) / (2 * q * (2 * q - 1))
-    return y
+def apply_analog_output_node_settings(analogOut, node: DwfAnalogOutNode, channel_settings):
+    """Apply the AnalogOutNodeSettings of several channels to the given node.
 
+    The 'channel_settings' argument is a sequence of (channel_index, settings) pairs. The setter method for each
+    of the settings is looked up once, rather than once per channel.
+    """
 
-def _waveform_square(symmetry: float, x):
-    q = np.clip(symmetry / 100.0, 0.0, 1.0)
-    if q == 0.0:
-        y = np.full_like(x, -1.0)
-    else:
-        x = np.mod(x, 1.0)
-        y = np.sign(q - x)
-    return y
+    setters = [(getattr(analogOut, "node{}Set".format(field.capitalize())), field_index)
+               for (field_index, field) in enumerate(AnalogOutNodeSettings._fields)]
 
+    for (channel_index, settings) in channel_settings:
+        for (setter, field_index) in setters:
+            setter(channel_index, node, settings[field_index])
 
-def _calculate_signal(settings: AnalogOutNodeSettings, t):
 
-    # pylint: disable=too-many-branches
+def _reduce_phase(x):
+    """Reduce the phase x (in periods) to the range [0, 1), in place.
 
-    x = t * settings.frequency + settings.phase / 360.0
+    Subtracting the floor gives the same result as np.mod(x, 1.0), but is several times faster.
+    """
+    x -= np.floor(x)
+    return x
 
-    if settings.function == DwfAnalogOutFunction.DC:
 
-        # All-zero, independent of the symmetry value.
-        y = np.zeros_like(x)
-
-    elif settings.function == DwfAnalogOutFunction.Sine:
+def _waveform_triangle(symmetry: float, x):
+    x = _reduce_phase(x)
+    q = np.clip(0.5 * (symmetry / 100.0), 0.000000001, 0.4999999999)
+    # The triangle is piecewise linear: it rises from 0 to 1 at q, falls to -1 at (1 - q), and rises back to 0 at 1.
+    # Interpolating between these corner points takes a single pass over x.
+    y = np.interp(x, (0.0, q, 1.0 - q, 1.0), (0.0, 1.0, -1.0, 0.0))
+    return y
 
-        # The angle of which the sine is taken varies as a three-part piecewise linear function.
-        angle = _waveform_triangle(settings.symmetry, x) * (0.5 * np.pi)
 
-        y = np.sin(angle)
+def _waveform_square(symmetry: float, x):
+    q = np.clip(symmetry / 100.0, 0.0, 1.0)
+    if q == 0.0:
+        x.fill(-1.0)
+    else:
+        # The sign of (q - x) is calculated in place: one comparison per sample, without temporaries.
+        _reduce_phase(x)
+        np.subtract(q, x, out=x)
+        np.sign(x, out=x)
+    return x
 
-    elif settings.function == DwfAnalogOutFunction.Square:
-        # Amplitude in range -1 .. 1
-        q = np.clip(settings.symmetry / 100.0, 0.0, 1.0)
 
-        if q == 0.0:
-            y = np.full_like(x, -1.0)
-        else:
-            x = np.mod(x, 1)
-            y = np.sign(q - x)
+def _waveform_dc(symmetry: float, x):
+    # pylint: disable=unused-argument
+    # All-zero, independent of the symmetry value.
+    x.fill(0.0)
+    return x
 
-    elif settings.function == DwfAnalogOutFunction.Triangle:
 
-        y = _waveform_triangle(settings.symmetry, x)
+def _waveform_sine(symmetry: float, x):
+    # The angle of which the sine is taken varies as a three-part piecewise linear function.
+    angle = _waveform_triangle(symmetry, x)
+    angle *= (0.5 * np.pi)
+    return np.sin(angle, out=angle)
 
-    elif settings.function == DwfAnalogOutFunction.RampUp:
 
-        q = np.clip(settings.symmetry / 100.0, 0.0, 1.0)
+def _waveform_ramp_up(symmetry: float, x):
+    q = np.clip(symmetry / 100.0, 0.0, 1.0)
+    if q == 0.0:
+        x.fill(1.0)
+    else:
+        _reduce_phase(x)
+        work = np.subtract(x, q)
+        np.abs(work, out=work)
+        x -= work
+        x *= (1.0 / q)
+    return x
 
-        if q == 0.0:
-            y = np.ones_like(x)
-        else:
-            x = np.mod(x, 1.0)
-            y = (x - np.abs(x - q)) / q
 
-    elif settings.function == DwfAnalogOutFunction.RampDown:
+def _waveform_ramp_down(symmetry: float, x):
+    q = np.clip(symmetry / 100.0, 0.0, 1.0)
+    if q == 1.0:
+        x.fill(1.0)
+    else:
+        _reduce_phase(x)
+        work = np.subtract(x, q)
+        np.abs(work, out=work)
+        x -= 1.0
+        x += work
+        x *= (1.0 / (q - 1.0))
+    return x
+
+
+def _waveform_pulse(symmetry: float, x):
+    # Amplitude in range 0 .. 1
+    y = _waveform_square(symmetry, x)
+    y += 1.0
+    y *= 0.5
+    return y
 
-        q = np.clip(settings.symmetry / 100.0, 0.0, 1.0)
 
-        if q == 1.0:
-            y = np.ones_like(x)
-        else:
-            x = np.mod(x, 1.0)
-            y = ((x - 1) + np.abs(x - q)) / (q - 1)
+def _waveform_trapezium(symmetry: float, x):
+    x = _reduce_phase(x)
+    q = np.clip(0.25 * (symmetry / 100.0), 0.000000001, 0.25)
+    # The trapezium is piecewise linear: it rises from 0 to 1 at q, stays at 1 until (0.5 - q), falls to -1 at
+    # (0.5 + q), stays at -1 until (1 - q), and rises back to 0 at 1.
+    y = np.interp(x, (0.0, q, 0.5 - q, 0.5 + q, 1.0 - q, 1.0), (0.0, 1.0, 1.0, -1.0, -1.0, 0.0))
+    return y
 
-    elif settings.function == DwfAnalogOutFunction.Pulse:
-        # Amplitude in range 0 .. 1
-        y = 0.5 * (1.0 + _waveform_square(settings.symmetry, x))
 
-    elif settings.function == DwfAnalogOutFunction.Trapezium:
+def _waveform_sine_power(symmetry: float, x):
+    x *= (2 * np.pi)
+    plain_old_sine = np.sin(x, out=x)
 
-        x = np.mod(x, 1.0)
+    # In the SinePower wave function, the 'symmetry' value is abused
+    # to indicate and exponent between 1.0 and 0.0.
 
-        q = np.clip(0.25 * (settings.symmetry / 100.0), 0.000000001, 0.25)
+    exponent_setting = np.clip(symmetry, -99.999999999, 100.000) / 100.0
 
-        y = (-1 + 2*x - np.abs(q - x) + np.abs(q - x + 0.5) + np.abs(q + x - 1.0) - np.abs(q + x - 0.5)) / (2 * q)
+    if exponent_setting >= 0:
+        exponent = (1.0 - exponent_setting)  # pylint: disable=superfluous-parens
+    else:
+        exponent = 1.0 / (1.0 + exponent_setting)
 
-    elif settings.function == DwfAnalogOutFunction.SinePower:
+    if exponent == 1.0:
+        # A symmetry of zero yields the plain sine; skip the (expensive) power calculation.
+        return plain_old_sine
 
-        plain_old_sine = np.sin(x * 2 * np.pi)
+    # The power is taken of the magnitude, in a work array, and the sign of the sine is copied back in place.
+    work = np.abs(plain_old_sine)
+    np.power(work, exponent, out=work)
+    return np.copysign(work, plain_old_sine, out=plain_old_sine)
 
-        # In the SinePower wave function, the 'symmetry' value is abused
-        # to indicate and exponent between 1.0 and 0.0.
 
-        exponent_setting = np.clip(settings.symmetry, -99.999999999, 100.000) / 100.0
+# Map each supported function to the waveform that calculates it from the symmetry and phase (in periods).
+# Each waveform has an amplitude in the range -1 .. 1, except for Pulse, which has an amplitude in the range 0 .. 1.
+_WAVEFORMS = {
+    DwfAnalogOutFunction.DC        : _waveform_dc,
+    DwfAnalogOutFunction.Sine      : _waveform_sine,
+    DwfAnalogOutFunction.Square    : _waveform_square,
+    DwfAnalogOutFunction.Triangle  : _waveform_triangle,
+    DwfAnalogOutFunction.RampUp    : _waveform_ramp_up,
+    DwfAnalogOutFunction.RampDown  : _waveform_ramp_down,
+    DwfAnalogOutFunction.Pulse     : _waveform_pulse,
+    DwfAnalogOutFunction.Trapezium : _waveform_trapezium,
+    DwfAnalogOutFunction.SinePower : _waveform_sine_power
+}
 
-        if exponent_setting >= 0:
-            exponent = (1.0 - exponent_setting)  # pylint: disable=superfluous-parens
-        else:
-            exponent = 1.0 / (1.0 + exponent_setting)
 
-        y = np.copysign(np.abs(plain_old_sine) ** exponent, plain_old_sine)
+def _calculate_signal(settings: AnalogOutNodeSettings, t):
 
-    else:
+    waveform = _WAVEFORMS.get(settings.function)
+    if waveform is None:
         raise RuntimeError()
 
-    return y
+    # The signal is calculated in place, in the array that holds the phase of each sample (in periods), where
+    # possible. This avoids allocating a new array for each step of the calculation.
+
+    x = np.multiply(t, settings.frequency)
+    x += settings.phase / 360.0
+
+    return waveform(settings.symmetry, x)
 
 
 def analog_output_signal_simulator(carrier_settings: AnalogOutNodeSettings,
@@ -175,15 +229,24 @@ def analog_output_signal_simulator(carrier_settings: AnalogOutNodeSettings,
     if fm_settings is not None:
         raise RuntimeError("FM modulation not yet supported.")
 
-    if carrier_settings.enable:
-        carrier_signal = _calculate_signal(carrier_settings, t)
-    else:
-        carrier_signal = np.zeros_like(t)
+    if not carrier_settings.enable:
+        # A disabled carrier is all-zero, and stays all-zero under amplitude modulation.
+        # Note that the carrier offset is always applied, even if the carrier is disabled.
+        return np.full(np.shape(t), carrier_settings.offset, dtype=np.float64)
+
+    # The _calculate_signal() function returns a freshly allocated array, so the modulation, amplitude,
+    # and offset can be applied to the carrier signal in place.
+
+    carrier_signal = _calculate_signal(carrier_settings, t)
 
     if am_settings is not None:
         if am_settings.enable:
+            # Scale the AM signal in place to the factor (100 + offset + amplitude * am_signal) / 100.
             am_signal = _calculate_signal(am_settings, t)
-            carrier_signal = (100.0 + am_settings.offset + am_settings.amplitude * am_signal) / 100.0 * carrier_signal
+            am_signal *= am_settings.amplitude / 100.0
+            am_signal += (100.0 + am_settings.offset) / 100.0
+            carrier_signal *= am_signal
 
-    # Note that the carrier offset is always applied, even if the carrier is disabled.
-    return carrier_settings.offset + carrier_settings.amplitude * carrier_signal
+    carrier_signal *= carrier_settings.amplitude
+    carrier_signal += carrier_settings.offset
+    return carrier_signal
@@ -0,0 +1,247 @@
+#! /usr/bin/env python3
+
+"""Keep a Digilent Waveforms device open in a long-running process, and run demos on it on request.
+
+Loading the DWF library and opening a device can take more than a second. When iterating on a demo, that cost is
+paid on every run. Running this module as a script opens the device once, and then listens on a Unix domain socket
+(a named pipe on Windows) for requests to run a demo on the open device.
+
+Demos that support this take a '--connect' command line argument. Instead of opening a device themselves, they send
+the name of their module, the name of a function in that module, and their parsed command line arguments to the
+daemon. The daemon imports the module and calls the function with the open device and the arguments. Only the
+functions listed in DEMO_FUNCTIONS are accepted.
+
+Some demos open their device in a specific configuration, e.g. the one with the largest AnalogIn buffer. The daemon
+opens its device in the configuration given by its '--configuration' argument, and refuses to run demos that need
+a different configuration, rather than running them with, say, a smaller buffer.
+
+The daemon generates a random authentication key when it starts, and stores it in a directory that only the current
+user can access; on Unix, the socket is kept in that directory as well. The daemon and its clients authenticate each
+other with this key before any data is exchanged, so other local users can neither submit requests to the daemon,
+nor impersonate it.
+
+Note that the demo runs in the daemon process, so its output (and any plot windows) appear there. The client waits
+until the demo finishes. Press CTRL-C in the daemon to interrupt a running demo; press it again while the daemon is
+idle to stop the daemon.
+"""
+
+import argparse
+import getpass
+import importlib
+import os
+import secrets
+import stat
+import tempfile
+from typing import Optional
+from pickle import UnpicklingError
+from multiprocessing import AuthenticationError
+from multiprocessing.connection import Listener, Client
+
+from pydwf import DwfLibrary, DwfEnumConfigInfo, PyDwfError
+from pydwf.utilities import openDwfDevice
+
+
+def _maximize_analog_in_buffer_size(configuration_parameters):
+    """Select the configuration with the highest possible analog in buffer size."""
+    return configuration_parameters[DwfEnumConfigInfo.AnalogInBufferSize]
+
+
+# The device configurations the daemon can open its device in, with the function that scores the configurations
+# of the device to select it. Without a function, openDwfDevice() selects the default configuration.
+CONFIGURATIONS = {
+    "default"          : None,
+    "analog-in-buffer" : _maximize_analog_in_buffer_size
+}
+
+# The (module name, function name) pairs that the daemon is willing to run, with the device configuration they need,
+# or None if they can run in any configuration.
+DEMO_FUNCTIONS = {
+    ("AnalogIO"                        , "run_demos"): None,
+    ("AnalogInRecordMode"              , "run_demos"): "analog-in-buffer",
+    ("AnalogInShiftScanShiftScreenDemo", "run_demos"): "analog-in-buffer",
+    ("AnalogInSimple"                  , "run_demos"): None
+}
+
+
+def _private_directory() -> str:
+    """Return a directory that only the current user can access, creating it if necessary."""
+
+    if os.name == "nt":
+        # The local application data directory is private to the user.
+        directory = os.path.join(os.environ.get("LOCALAPPDATA", os.path.expanduser("~")), "pydwf-examples")
+        os.makedirs(directory, exist_ok=True)
+        return directory
+
+    runtime_directory = os.environ.get("XDG_RUNTIME_DIR")
+    if runtime_directory:
+        directory = os.path.join(runtime_directory, "pydwf-examples")
+    else:
+        directory = os.path.join(tempfile.gettempdir(), "pydwf-examples-{}".format(os.getuid()))
+
+    os.makedirs(directory, mode=0o700, exist_ok=True)
+
+    # The directory may have existed already. Make sure that it is ours, and that nobody else can access it.
+    directory_stat = os.lstat(directory)
+    if not (stat.S_ISDIR(directory_stat.st_mode) and directory_stat.st_uid == os.getuid() and
+            directory_stat.st_mode & 0o077 == 0):
+        raise RuntimeError("Directory {!r} is not private to the current user.".format(directory))
+
+    return directory
+
+
+def _authkey_filename() -> str:
+    """Return the name of the file that holds the authentication key of the running daemon."""
+    return os.path.join(_private_directory(), "authkey")
+
+
+def default_address() -> str:
+    """Return the default address of the daemon: a Unix domain socket, or a named pipe on Windows."""
+    if os.name == "nt":
+        return r"\\.\pipe\pydwf-examples-{}".format(getpass.getuser())
+    return os.path.join(_private_directory(), "pydwf-examples.sock")
+
+
+def _run_request(device, configuration: str, module_name, function_name, args) -> Optional[str]:
+    """Run a single demo request; return None if it succeeded, or an error message to report to the client."""
+
+    key = (module_name, function_name)
+
+    if key not in DEMO_FUNCTIONS:
+        result = "{}.{}() is not a known demo function.".format(module_name, function_name)
+        print("Rejected request: {}".format(result))
+        return result
+
+    required_configuration = DEMO_FUNCTIONS[key]
+    if required_configuration not in (None, configuration):
+        result = "{}.{}() needs a daemon started with '--configuration {}'.".format(
+            module_name, function_name, required_configuration)
+        print("Rejected request: {}".format(result))
+        return result
+
+    print("Running {}.{}() ...".format(module_name, function_name))
+
+    try:
+        demo_function = getattr(importlib.import_module(module_name), function_name)
+        demo_function(device, args)
+        result = None
+    except KeyboardInterrupt:
+        print("Keyboard interrupt, ending demo.")
+        result = None
+    except Exception as exception:  # pylint: disable=broad-except
+        # Report the error to the client, and keep serving.
+        result = "{}: {}".format(type(exception).__name__, exception)
+        print("Demo failed: {}".format(result))
+
+    return result
+
+
+def serve(device, address: Optional[str] = None, configuration: str = "default") -> None:
+    """Run demo requests on the given open device until interrupted.
+
+    The 'configuration' argument is the key in CONFIGURATIONS of the configuration the device was opened in.
+    """
+
+    if address is None:
+        address = default_address()
+
+        # Remove a socket left behind by a previous daemon that did not shut down cleanly. This is only safe in
+        # our private directory; elsewhere, the socket may belong to someone else.
+        if os.name != "nt" and os.path.exists(address) and stat.S_ISSOCK(os.lstat(address).st_mode):
+            os.remove(address)
+
+    # Generate a fresh authentication key, readable by the current user only.
+    authkey = secrets.token_bytes(32)
+    authkey_fd = os.open(_authkey_filename(), os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with os.fdopen(authkey_fd, "wb") as fo:
+        fo.write(authkey)
+
+    # The address family (AF_UNIX or AF_PIPE) is derived from the address.
+    with Listener(address, authkey=authkey) as listener:
+
+        print("Serving demo requests on {!r}, press CTRL-C to stop.".format(address))
+
+        while True:
+
+            try:
+                connection = listener.accept()
+            except AuthenticationError:
+                print("Rejected a connection that did not authenticate.")
+                continue
+            except (EOFError, OSError) as exception:
+                print("Connection failed: {}: {}".format(type(exception).__name__, exception))
+                continue
+
+            # A client that goes away early, or sends a malformed request, must not stop the daemon (and close
+            # the device that it keeps open).
+            with connection:
+                try:
+                    (module_name, function_name, args) = connection.recv()
+                    result = _run_request(device, configuration, module_name, function_name, args)
+                    connection.send(result)
+                except (EOFError, OSError, ValueError, TypeError, UnpicklingError) as exception:
+                    print("Request failed: {}: {}".format(type(exception).__name__, exception))
+
+
+def run_on_daemon(module_name: str, function_name: str, args, address: Optional[str] = None) -> None:
+    """Ask the daemon to run function 'function_name' of module 'module_name' on its device, and wait for it."""
+
+    if address is None:
+        address = default_address()
+
+    try:
+        with open(_authkey_filename(), "rb") as fi:
+            authkey = fi.read()
+    except FileNotFoundError:
+        raise RuntimeError("No dwf_daemon.py has been started by the current user.") from None
+
+    with Client(address, authkey=authkey) as connection:
+        connection.send((module_name, function_name, args))
+        result = connection.recv()
+
+    if result is not None:
+        raise RuntimeError("Demo failed in daemon: {}".format(result))
+
+
+def main():
+    """Parse arguments, open the device, and serve demo requests."""
+
+    parser = argparse.ArgumentParser(description="Keep a Digilent Waveforms device open and run demos on it.")
+
+    parser.add_argument(
+            "-sn", "--serial-number-filter",
+            type=str,
+            nargs='?',
+            dest="serial_number_filter",
+            help="serial number filter to select a specific Digilent Waveforms device"
+        )
+
+    parser.add_argument(
+            "-c", "--configuration",
+            choices=CONFIGURATIONS.keys(),
+            default="default",
+            help="device configuration to open: the default one, or the one with the largest AnalogIn buffer "
+                 "(needed by the AnalogIn record and scan demos)"
+        )
+
+    parser.add_argument(
+            "-a", "--address",
+            type=str,
+            default=None,
+            help="Unix domain socket or Windows named pipe to listen on (default: {})".format(default_address())
+        )
+
+    args = parser.parse_args()
+
+    try:
+        dwf = DwfLibrary()
+        with openDwfDevice(dwf, serial_number_filter=args.serial_number_filter,
+                           score_func=CONFIGURATIONS[args.configuration]) as device:
+            serve(device, args.address, args.configuration)
+    except PyDwfError as exception:
+        print("PyDwfError:", exception)
+    except KeyboardInterrupt:
+        print("Keyboard interrupt, stopping daemon.")
+
+
+if __name__ == "__main__":
+    main()
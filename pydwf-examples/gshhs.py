@@ -2,6 +2,7 @@
 
 import urllib.request
 import shutil
+import struct
 import zipfile
 import os
 
@@ -34,76 +35,276 @@ gshhs_point = np.dtype([
     ])
 
 
+# The polygon header and point in native byte order, as stored in a GSHHS_PolygonSet.
+_gshhs_poly_header_native = gshhs_poly_header.newbyteorder('=')
+_gshhs_point_native = gshhs_point.newbyteorder('=')
+
+
+def _flag_level(flag):
+    """Return 'level' field of flags, for a single flag value or an array of flags."""
+    return flag & 255
+
+
+def _flag_version(flag):
+    """Return 'version' field of flags, for a single flag value or an array of flags."""
+    return (flag >> 8) & 255
+
+
+def _flag_greenwich(flag):
+    """Return 'greenwich crossing' field of flags, for a single flag value or an array of flags."""
+    return (flag >> 16) & 1
+
+
+def _flag_source(flag):
+    """Return 'source' field of flags, for a single flag value or an array of flags."""
+    return (flag >> 24) & 1
+
+
+def _flag_river(flag):
+    """Return 'river' field of flags, for a single flag value or an array of flags."""
+    return (flag >> 25) & 1
+
+
 class GSHHS_Polygon:
-    """Represents a single GSHHS polygon."""
-
-    # pylint: disable=too-many-instance-attributes
-
-    def __init__(self, poly_header, poly_points):
-        if poly_header["n"] != len(poly_points):
-            raise RuntimeError("value n is unexpected")
-        self.id_ = int(poly_header["id"])
-        self.flag = int(poly_header["flag"])
-        self.west = int(poly_header["west"])
-        self.east = int(poly_header["east"])
-        self.south = int(poly_header["south"])
-        self.north = int(poly_header["north"])
-        self.area = int(poly_header["area"])
-        self.area_full = int(poly_header["area_full"])
-        self.container = int(poly_header["container"])
-        self.ancestor = int(poly_header["ancestor"])
-        self.points = poly_points
+    """Represents a single GSHHS polygon.
+
+    The polygon's header fields and points are not copied; they are read from the header and point arrays of the
+    GSHHS_PolygonSet the polygon was taken from.
+    """
+
+    def __init__(self, polygon_set, index):
+        self._header = polygon_set.headers[index]
+        self._all_points = polygon_set.points
+        self._points_start = int(polygon_set.point_starts[index])
+
+    @property
+    def points(self):
+        """Return the polygon's points, as a view into the point array of the polygon set."""
+        return self._all_points[self._points_start:self._points_start + int(self._header["n"])]
+
+    @property
+    def id_(self):
+        """Return 'id' field of header."""
+        return int(self._header["id"])
+
+    @property
+    def flag(self):
+        """Return 'flag' field of header."""
+        return int(self._header["flag"])
+
+    @property
+    def west(self):
+        """Return 'west' field of header."""
+        return int(self._header["west"])
+
+    @property
+    def east(self):
+        """Return 'east' field of header."""
+        return int(self._header["east"])
+
+    @property
+    def south(self):
+        """Return 'south' field of header."""
+        return int(self._header["south"])
+
+    @property
+    def north(self):
+        """Return 'north' field of header."""
+        return int(self._header["north"])
+
+    @property
+    def area(self):
+        """Return 'area' field of header."""
+        return int(self._header["area"])
+
+    @property
+    def area_full(self):
+        """Return 'area_full' field of header."""
+        return int(self._header["area_full"])
+
+    @property
+    def container(self):
+        """Return 'container' field of header."""
+        return int(self._header["container"])
+
+    @property
+    def ancestor(self):
+        """Return 'ancestor' field of header."""
+        return int(self._header["ancestor"])
 
     @property
     def level(self):
         """Return 'level' field of flags."""
-        return self.flag & 255
+        return _flag_level(self.flag)
 
     @property
     def version(self):
         """Return 'version' field of flags."""
-        return (self.flag >> 8) & 255
+        return _flag_version(self.flag)
 
     @property
     def greenwich(self):
         """Return 'greenwich crossing' field of flags."""
-        return (self.flag >> 16) & 1
+        return _flag_greenwich(self.flag)
 
     @property
     def source(self):
         """Return 'source' field of flags."""
-        return (self.flag >> 24) & 1
+        return _flag_source(self.flag)
 
     @property
     def river(self):
         """Return 'river' field of flags."""
-        return (self.flag >> 25) & 1
+        return _flag_river(self.flag)
 
 
-def read_gshhs_polygons(gshhs_filename, polygon_filter_func=None):
-    """Read binary GSHHS data directly from the GSHHS zip file."""
+class GSHHS_PolygonSet:
+    """Represents the polygons of a GSHHS dataset.
 
-    polygons = []
-    with zipfile.ZipFile(_GSHHS_ZIPFILE, 'r') as gshhs_zip, gshhs_zip.open(gshhs_filename, 'r') as fi:
-        gshhs_binary_polygon_data = fi.read()
+    The headers of all polygons are stored in a single structured array, in native byte order, so they can be
+    inspected and filtered with vectorized operations, e.g. polygon_set.level <= 2.
+
+    The points of all polygons are stored consecutively in a single structured array; the points of polygon i
+    start at index point_starts[i].
+    """
+
+    def __init__(self, headers, points):
+        self.headers = headers
+        self.points = points
+        self.point_starts = np.cumsum(headers["n"]) - headers["n"]
+
+    def __len__(self):
+        return len(self.headers)
+
+    @property
+    def level(self):
+        """Return array of 'level' fields of the flags."""
+        return _flag_level(self.headers["flag"])
+
+    @property
+    def version(self):
+        """Return array of 'version' fields of the flags."""
+        return _flag_version(self.headers["flag"])
+
+    @property
+    def greenwich(self):
+        """Return array of 'greenwich crossing' fields of the flags."""
+        return _flag_greenwich(self.headers["flag"])
+
+    @property
+    def source(self):
+        """Return array of 'source' fields of the flags."""
+        return _flag_source(self.headers["flag"])
+
+    @property
+    def river(self):
+        """Return array of 'river' fields of the flags."""
+        return _flag_river(self.headers["flag"])
+
+    def polygons(self, mask=None):
+        """Return the polygons as GSHHS_Polygon instances; if a boolean mask is given, only the selected ones."""
+        indices = range(len(self.headers)) if mask is None else np.flatnonzero(mask).tolist()
+        return [GSHHS_Polygon(self, index) for index in indices]
+
+
+def _scan_gshhs_polygon_offsets(gshhs_binary_polygon_data):
+    """Find the byte offsets of all polygon headers in binary GSHHS data.
+
+    Only the point count of each header is read. Returns the header offsets and the point counts as NumPy arrays.
+
+    Raises:
+        ValueError: the data is truncated, or a header has a negative point count.
+    """
+    unpack_num_points = struct.Struct(">i").unpack_from
+
+    header_size = gshhs_poly_header.itemsize
+    point_size = gshhs_point.itemsize
+
+    header_offsets = []
+    point_counts = []
+
+    data_size = len(gshhs_binary_polygon_data)
 
     offset = 0
-    while offset != len(gshhs_binary_polygon_data):
+    while offset < data_size:
+        if offset + header_size > data_size:
+            raise ValueError("GSHHS data truncated: incomplete polygon header at byte offset {}".format(offset))
+        (num_points, ) = unpack_num_points(gshhs_binary_polygon_data, offset + 4)
+        if num_points < 0:
+            raise ValueError("GSHHS polygon header at byte offset {} has a negative point count ({})".format(
+                offset, num_points))
+        header_offsets.append(offset)
+        point_counts.append(num_points)
+        offset += header_size + num_points * point_size
+
+    if offset != data_size:
+        raise ValueError("GSHHS data truncated: the points of the polygon at byte offset {} extend past the end "
+                         "of the data".format(header_offsets[-1]))
+
+    return (np.array(header_offsets, dtype=np.intp), np.array(point_counts, dtype=np.intp))
+
+
+def _read_zip_member(zip_file, filename):
+    """Read a member of a zip file into a single, preallocated bytearray.
+
+    Reading the decompressed data directly into a buffer of the final size avoids the temporary chunks that
+    are joined by a plain read(), which would double the peak memory use for large files.
+    """
+    data = bytearray(zip_file.getinfo(filename).file_size)
+    with zip_file.open(filename, 'r') as fi, memoryview(data) as view:
+        offset = 0
+        while offset != len(data):
+            count = fi.readinto(view[offset:])
+            if count == 0:
+                raise RuntimeError("unexpected end of zip file member {!r}".format(filename))
+            offset += count
+    return data
+
 
-        poly_header = np.frombuffer(gshhs_binary_polygon_data, dtype=gshhs_poly_header, count=1, offset=offset)
-        offset += gshhs_poly_header.itemsize
+def read_gshhs_polygon_set(gshhs_filename):
+    """Read binary GSHHS data directly from the GSHHS zip file, as a GSHHS_PolygonSet."""
 
-        poly_header = poly_header[0]
+    with zipfile.ZipFile(_GSHHS_ZIPFILE, 'r') as gshhs_zip:
+        gshhs_binary_polygon_data = _read_zip_member(gshhs_zip, gshhs_filename)
 
-        num_points = poly_header["n"]
+    (header_offsets, point_counts) = _scan_gshhs_polygon_offsets(gshhs_binary_polygon_data)
+
+    # All headers and points are 32-bit words. Convert the entire buffer to native byte order in place, once, so
+    # the headers and points can be used without byte swapping. Then gather the words of all headers in one go,
+    # and view them as an array of headers. The remaining words are the points of all polygons, in order.
+    words = np.frombuffer(gshhs_binary_polygon_data, dtype='>i4')
+    words.byteswap(inplace=True)
+    words = words.view(np.int32)
+
+    header_words_per_polygon = gshhs_poly_header.itemsize // words.itemsize
+    header_word_indices = (header_offsets // words.itemsize)[:, np.newaxis] + np.arange(header_words_per_polygon)
+
+    headers = words[header_word_indices].view(_gshhs_poly_header_native).reshape(-1)
+
+    is_point_word = np.ones(len(words), dtype=bool)
+    is_point_word[header_word_indices] = False
+    points = words[is_point_word].view(_gshhs_point_native)
+
+    if len(points) != point_counts.sum():
+        raise ValueError("GSHHS data has {} points, but the polygon headers account for {} points".format(
+            len(points), point_counts.sum()))
+
+    return GSHHS_PolygonSet(headers, points)
+
+
+def read_gshhs_polygons(gshhs_filename, polygon_filter_func=None, polygon_mask_func=None):
+    """Read binary GSHHS data directly from the GSHHS zip file, as a list of GSHHS_Polygon instances.
+
+    The polygon_mask_func, if given, is called with the GSHHS_PolygonSet and returns a boolean mask of the polygons
+    to keep. It is applied before the polygon_filter_func, which is called for each remaining polygon.
+    """
 
-        poly_points = np.frombuffer(gshhs_binary_polygon_data, dtype=gshhs_point, count=num_points, offset=offset)
-        offset += num_points * gshhs_point.itemsize
+    polygon_set = read_gshhs_polygon_set(gshhs_filename)
 
-        polygon = GSHHS_Polygon(poly_header, poly_points)
+    polygons = polygon_set.polygons(None if polygon_mask_func is None else polygon_mask_func(polygon_set))
 
-        if polygon_filter_func is None or polygon_filter_func(polygon):
-            polygons.append(polygon)
+    if polygon_filter_func is not None:
+        polygons = [polygon for polygon in polygons if polygon_filter_func(polygon)]
 
     return polygons
 
@@ -0,0 +1,53 @@
+"""Convenience classes for fast, repeated updates of matplotlib plots, shared by the demos."""
+
+
+class BlittedPlot:
+    """Redraw a fixed set of animated matplotlib artists on top of a cached figure background.
+
+    Redrawing a full figure (axes, grid, labels, legend) for every update is slow. Instead, we draw
+    the static parts of the figure once, cache the rendered background, and only redraw the artists that
+    change. The background is re-captured whenever matplotlib does a full redraw, e.g. after a resize.
+
+    The 'closed' attribute becomes True once the user closes the figure window.
+    """
+
+    def __init__(self, fig, artists):
+        self.fig = fig
+        self.artists = artists
+        self.background = None
+        self.closed = False
+        for artist in artists:
+            artist.set_animated(True)
+        fig.canvas.mpl_connect('draw_event', self._on_draw)
+        fig.canvas.mpl_connect('close_event', self._on_close)
+
+    def _on_draw(self, event):
+        """Capture the background after a full redraw, and draw the animated artists on top of it."""
+        # pylint: disable=unused-argument
+        self.background = self.fig.canvas.copy_from_bbox(self.fig.bbox)
+        self._draw_artists()
+
+    def _on_close(self, event):
+        """Note that the figure window was closed."""
+        # pylint: disable=unused-argument
+        self.closed = True
+
+    def _draw_artists(self):
+        for artist in self.artists:
+            self.fig.draw_artist(artist)
+
+    def update(self):
+        """Show the current state of the animated artists.
+
+        This does not enter the GUI event loop for a fixed amount of time like plt.pause() does; it only
+        processes the GUI events that are pending.
+        """
+        canvas = self.fig.canvas
+        if self.background is None:
+            # No background available yet; do a full redraw. This captures the background.
+            canvas.draw()
+        else:
+            canvas.restore_region(self.background)
+            self._draw_artists()
+        canvas.blit(self.fig.bbox)
+        canvas.flush_events()